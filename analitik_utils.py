@@ -0,0 +1,147 @@
+# ============================== analitik_utils.py ==============================
+
+import numpy as np
+import pandas as pd
+from utils import parse_tanggal
+
+# ======================================================
+# ANALITIK PERTUMBUHAN (VELOCITY & PERINGATAN DINI)
+# ======================================================
+# Semua perhitungan berbasis groupby + diff atas seluruh populasi sekaligus,
+# tanpa loop per anak.
+
+KOLOM_Z = ["Z-Score BB/U", "Z-Score TB/U", "Z-Score BB/TB"]
+
+# Ambang peringatan dini
+MIN_TURUN_BERUNTUN = 2      # z-score BB/U turun >= 2 kunjungan berturut-turut
+MAKS_BULAN_ABSEN = 2        # tidak datang lebih dari 2 bulan
+AMBANG_TURUN_Z = 0.0        # penurunan z dianggap turun bila < -AMBANG_TURUN_Z
+MAKS_UMUR_BALITA = 60       # bulan; di atas ini anak sudah keluar dari program posyandu
+
+
+def kunci_anak(df):
+    return ["Desa", "Nama Anak"] if "Desa" in df.columns else ["Nama Anak"]
+
+
+def siapkan_deret(df_pengukuran):
+    """
+    Deret waktu per anak: tanggal ter-parse, numerik, satu pengukuran
+    (terakhir) per anak per bulan, terurut per anak lalu tanggal.
+    """
+    df = df_pengukuran.copy()
+    df["Tanggal Pengukuran"] = parse_tanggal(df["Tanggal Pengukuran"])
+    df = df.dropna(subset=["Tanggal Pengukuran"])
+
+    for col in ["BB", "TB"] + KOLOM_Z:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    kunci = kunci_anak(df)
+    df["_bulan"] = df["Tanggal Pengukuran"].dt.year * 12 + df["Tanggal Pengukuran"].dt.month
+    df = df.sort_values(kunci + ["Tanggal Pengukuran"], kind="stable")
+    df = df.drop_duplicates(subset=kunci + ["_bulan"], keep="last")
+    return df.reset_index(drop=True)
+
+
+def hitung_velocity(df_deret):
+    """
+    Tambahkan kolom per kunjungan (dibanding kunjungan sebelumnya):
+    - Selang Bulan, Bulan Terlewat
+    - Velocity BB (kg/bulan), Velocity TB (cm/bulan)
+    - Delta Z BB/U, Delta Z TB/U, Delta Z BB/TB
+    - Turun Beruntun: jumlah penurunan z BB/U berturut-turut s.d. kunjungan ini
+    """
+    df = df_deret.copy()
+    kunci = kunci_anak(df)
+    g = df.groupby(kunci, sort=False)
+
+    selang = g["_bulan"].diff()
+    df["Selang Bulan"] = selang
+    df["Bulan Terlewat"] = (selang - 1).clip(lower=0).fillna(0).astype(int)
+
+    bagi = selang.where(selang > 0)
+    df["Velocity BB"] = g["BB"].diff() / bagi
+    df["Velocity TB"] = g["TB"].diff() / bagi
+    for col in KOLOM_Z:
+        df[f"Delta Z {col.split()[-1]}"] = g[col].diff()
+
+    # Hitungan beruntun: reset tiap kali tidak turun atau ganti anak
+    turun = (df["Delta Z BB/U"] < -AMBANG_TURUN_Z).to_numpy()
+    awal_anak = (g.cumcount() == 0).to_numpy()
+    blok = np.cumsum(~turun | awal_anak)
+    df["Turun Beruntun"] = pd.Series(turun.astype(int)).groupby(blok).cumsum().to_numpy()
+    return df
+
+
+def anak_berisiko(df_pengukuran, tanggal_acuan=None):
+    """
+    Satu baris per anak (kunjungan terakhir) yang memenuhi minimal satu flag:
+    - Gagal Tumbuh : z BB/U turun >= MIN_TURUN_BERUNTUN kali berturut-turut
+                     (termasuk anak yang statusnya masih "Normal")
+    - BB Tidak Naik: berat badan tetap/turun dibanding kunjungan sebelumnya
+    - Absen        : kunjungan terakhir > MAKS_BULAN_ABSEN bulan lalu
+    - Bolos        : ada bulan terlewat pada dua kunjungan terakhir
+    Anak yang umurnya kini (umur kunjungan terakhir + bulan sejak kunjungan)
+    sudah > MAKS_UMUR_BALITA bulan tidak ikut dinilai.
+    """
+    if df_pengukuran.empty:
+        return pd.DataFrame()
+
+    df = hitung_velocity(siapkan_deret(df_pengukuran))
+    kunci = kunci_anak(df)
+    terakhir = df.groupby(kunci, sort=False).tail(1).copy()
+
+    acuan = pd.Timestamp(tanggal_acuan) if tanggal_acuan is not None else pd.Timestamp.today()
+    bulan_acuan = acuan.year * 12 + acuan.month
+    terakhir["Bulan Sejak Kunjungan"] = bulan_acuan - terakhir["_bulan"]
+    if "Umur" in terakhir.columns:
+        umur_kini = pd.to_numeric(terakhir["Umur"], errors="coerce") + terakhir["Bulan Sejak Kunjungan"]
+        # Umur kosong tetap dinilai
+        terakhir = terakhir[~(umur_kini > MAKS_UMUR_BALITA)]
+
+    flag = {
+        "Gagal Tumbuh": terakhir["Turun Beruntun"] >= MIN_TURUN_BERUNTUN,
+        "BB Tidak Naik": terakhir["Velocity BB"] <= 0,
+        "Absen": terakhir["Bulan Sejak Kunjungan"] > MAKS_BULAN_ABSEN,
+        "Bolos": terakhir["Bulan Terlewat"] > 0,
+    }
+    for nama, mask in flag.items():
+        terakhir[nama] = mask.fillna(False).astype(bool)
+
+    nama_flag = np.array(list(flag))
+    matriks = terakhir[list(flag)].to_numpy()
+    terakhir["Alasan"] = [", ".join(nama_flag[baris]) for baris in matriks]
+
+    berisiko = terakhir[matriks.any(axis=1)]
+    berisiko = berisiko.sort_values(["Turun Beruntun", "Delta Z BB/U"], ascending=[False, True])
+    return berisiko.drop(columns=["_bulan"]).reset_index(drop=True)
+
+
+# ======================================================
+# SEBARAN POPULASI (PITA PERSENTIL)
+# ======================================================
+# Untuk populasi besar, titik per anak-bulan diganti ringkasan per periode:
+# pita P3-P97 dan P15-P85 serta garis median, dihitung sekali per periode.
+
+PERSENTIL_PITA = [3, 15, 50, 85, 97]
+AMBANG_TITIK_SEBARAN = 3000     # di atas jumlah titik ini grafik "Seluruh Data" memakai pita
+
+
+def pita_persentil(tanggal, nilai, per="M"):
+    """
+    Persentil nilai per periode (per="M" bulan / "Y" tahun).
+    Return DataFrame index = awal periode (Timestamp), kolom P3..P97, Rata-rata, Jumlah.
+    """
+    data = pd.DataFrame({
+        "periode": pd.to_datetime(tanggal).dt.to_period(per).dt.to_timestamp(),
+        "nilai": pd.to_numeric(nilai, errors="coerce"),
+    }).dropna()
+    if data.empty:
+        return pd.DataFrame(columns=[f"P{p}" for p in PERSENTIL_PITA] + ["Rata-rata", "Jumlah"])
+
+    g = data.groupby("periode")["nilai"]
+    pita = g.quantile(np.array(PERSENTIL_PITA) / 100).unstack()
+    pita.columns = [f"P{p}" for p in PERSENTIL_PITA]
+    pita["Rata-rata"] = g.mean()
+    pita["Jumlah"] = g.size()
+    return pita.sort_index()
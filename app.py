@@ -33,6 +33,7 @@ Aplikasi ini berfungsi untuk memantau pertumbuhan dan status gizi balita usia 0
 - Pendataan balita
 - Input pengukuran rutin
 - Monitoring grafik & prediksi kunjungan
+- Laporan bulanan posyandu (Excel / PDF)
 """)
 
 st.info("⬅️ Gunakan menu di sidebar untuk berpindah halaman")
@@ -0,0 +1,125 @@
+# ============================== fitur_utils.py ==============================
+
+import zlib
+
+import numpy as np
+import pandas as pd
+from analitik_utils import siapkan_deret, hitung_velocity, kunci_anak
+from utils import DESA_DEFAULT, POSYANDU_DESA, map_posyandu_series
+
+# ======================================================
+# FITUR PER ANAK UNTUK MODEL FREKUENSI KUNJUNGAN
+# ======================================================
+FITUR_MODEL = [
+    "jumlah_kunjungan", "rata_selang_bulan", "maks_selang_bulan", "total_bulan_terlewat",
+    "bulan_sejak_kunjungan", "umur_terakhir",
+    "z_bbu_terakhir", "z_tbu_terakhir", "z_bbtb_terakhir",
+    "tren_z_bbu", "tren_z_tbu", "tren_z_bbtb",
+    "posyandu_kode",
+]
+
+# Kode posyandu tetap (urutan aturan bawaan di utils), -1 = tidak terdaftar.
+# Posyandu desa lain (aturan dari secrets / isian sheet) diberi kode dari
+# hash nama, sehingga sama antara train_model.py dan aplikasi.
+KODE_POSYANDU = {
+    (desa, nama): i
+    for i, (desa, nama) in enumerate(
+        (desa, aturan[0]) for desa, daftar in POSYANDU_DESA.items() for aturan in daftar
+    )
+}
+
+def kode_posyandu(desa, nama):
+    if nama is None or pd.isna(nama) or not str(nama).strip():
+        return -1
+    if (desa, nama) in KODE_POSYANDU:
+        return KODE_POSYANDU[(desa, nama)]
+    return 1000 + zlib.crc32(f"{desa}|{str(nama).strip().upper()}".encode()) % 1_000_000
+
+# Label frekuensi kunjungan pada jendela setelah tanggal acuan
+JENDELA_LABEL_BULAN = 6
+
+def kategori_frekuensi(jumlah_kunjungan):
+    """Jumlah kunjungan dalam JENDELA_LABEL_BULAN -> kategori frekuensi"""
+    return np.select(
+        [jumlah_kunjungan >= 5, jumlah_kunjungan >= 2],
+        ["Rutin", "Kadang"],
+        default="Jarang",
+    )
+
+
+def _tren(g, x, y):
+    """Kemiringan regresi y terhadap x per anak (rumus tertutup, tanpa loop)"""
+    data = pd.DataFrame({"x": x, "y": y, "xy": x * y, "xx": x * x}).groupby(g.ngroup().to_numpy())
+    s = data.sum()
+    n = data.size()
+    penyebut = n * s["xx"] - s["x"] ** 2
+    return ((n * s["xy"] - s["x"] * s["y"]) / penyebut.where(penyebut != 0)).to_numpy()
+
+
+def _kode_posyandu(df_balita, index):
+    """Kode posyandu per anak sesuai index fitur (Nama Anak / Desa + Nama Anak)"""
+    if df_balita is None or df_balita.empty:
+        return np.full(len(index), -1)
+
+    ref = df_balita.copy()
+    desa = ref["Desa"] if "Desa" in ref.columns else None
+    ref["Posyandu"] = map_posyandu_series(ref["RT"], ref["RW"], desa, ref.get("Posyandu"))
+    ref["_desa"] = (ref["Desa"] if "Desa" in ref.columns else pd.Series(DESA_DEFAULT, index=ref.index)).astype(str).str.upper()
+    ref["_kode"] = [kode_posyandu(d, p) for d, p in zip(ref["_desa"], ref["Posyandu"])]
+
+    kunci = list(index.names)
+    ref = ref.drop_duplicates(subset=kunci).set_index(kunci)["_kode"]
+    return ref.reindex(index).fillna(-1).astype(int).to_numpy()
+
+
+def bangun_fitur(df_pengukuran, df_balita=None, tanggal_acuan=None):
+    """
+    Satu baris fitur per anak dari riwayat pengukuran (vektor, groupby).
+    Hanya riwayat s.d. tanggal_acuan yang dipakai (default: hari ini).
+    Index = kunci anak (Nama Anak, atau Desa + Nama Anak).
+    """
+    if df_pengukuran.empty:
+        return pd.DataFrame(columns=FITUR_MODEL)
+
+    acuan = pd.Timestamp(tanggal_acuan) if tanggal_acuan is not None else pd.Timestamp.today()
+    df = siapkan_deret(df_pengukuran)
+    df = hitung_velocity(df[df["Tanggal Pengukuran"] <= acuan])
+    if df.empty:
+        return pd.DataFrame(columns=FITUR_MODEL)
+
+    kunci = kunci_anak(df)
+    df["Umur"] = pd.to_numeric(df["Umur"], errors="coerce")
+    g = df.groupby(kunci, sort=True)
+    x = df["_bulan"].to_numpy(dtype=float)
+
+    fitur = pd.DataFrame({
+        "jumlah_kunjungan": g.size(),
+        "rata_selang_bulan": g["Selang Bulan"].mean(),
+        "maks_selang_bulan": g["Selang Bulan"].max(),
+        "total_bulan_terlewat": g["Bulan Terlewat"].sum(),
+        "bulan_sejak_kunjungan": (acuan.year * 12 + acuan.month) - g["_bulan"].last(),
+        "umur_terakhir": g["Umur"].last(),
+        "z_bbu_terakhir": g["Z-Score BB/U"].last(),
+        "z_tbu_terakhir": g["Z-Score TB/U"].last(),
+        "z_bbtb_terakhir": g["Z-Score BB/TB"].last(),
+    })
+    for col, nama in [("Z-Score BB/U", "tren_z_bbu"), ("Z-Score TB/U", "tren_z_tbu"), ("Z-Score BB/TB", "tren_z_bbtb")]:
+        fitur[nama] = _tren(g, x, df[col].to_numpy(dtype=float))
+    fitur["posyandu_kode"] = _kode_posyandu(df_balita, fitur.index)
+
+    # Anak dengan satu kunjungan belum punya selang/tren
+    return fitur[FITUR_MODEL].replace([np.inf, -np.inf], np.nan).fillna(0)
+
+
+def bangun_label(df_pengukuran, tanggal_acuan, jendela_bulan=JENDELA_LABEL_BULAN):
+    """
+    Jumlah kunjungan tiap anak pada (tanggal_acuan, tanggal_acuan + jendela_bulan].
+    Index = kunci anak; anak tanpa kunjungan tidak muncul (isi 0 saat reindex).
+    Ubah ke kelas dengan kategori_frekuensi().
+    """
+    acuan = pd.Timestamp(tanggal_acuan)
+    akhir = acuan + pd.DateOffset(months=jendela_bulan)
+    df = siapkan_deret(df_pengukuran)
+    kunci = kunci_anak(df)
+    jendela = df[(df["Tanggal Pengukuran"] > acuan) & (df["Tanggal Pengukuran"] <= akhir)]
+    return jendela.groupby(kunci).size()
@@ -1,8 +1,15 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
 import gspread
 import streamlit as st
 from google.oauth2.service_account import Credentials
-from utils import map_posyandu
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from utils import map_posyandu, map_posyandu_series, atur_posyandu_desa, DESA_DEFAULT
+from sheet_store import PengukuranStore, KonflikVersi, SnapshotLembar, PenyegarLatar
+from rollup_utils import RollupCube, TIDAK_TERDAFTAR
 
 # ==========================
 # GOOGLE SHEET CONFIG
@@ -10,23 +17,67 @@ from utils import map_posyandu
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
 SPREADSHEET_ID = "13wTe-OdWVgDDmLGIrRI50FQN_6_AlS0OMrv96nIVRFw"
 BALITA_SHEET_NAME = "Balita"
+PENGUKURAN_SHEET_NAME = "Pengukuran"
+
+# Sumber data per desa: {NAMA DESA: SPREADSHEET ID}.
+# Bisa ditambah lewat Streamlit Secrets, contoh:
+# [spreadsheets]
+# MLESE = "13wTe-..."
+# KARANGAN = "1AbC..."
+SPREADSHEET_SOURCES = {DESA_DEFAULT: SPREADSHEET_ID}
+
+# Backend offline untuk uji beban / pengembangan tanpa kredensial:
+# GIZI_BACKEND=palsu -> sheet sintetis di memori (tools/sheet_palsu.py)
+BACKEND_PALSU = os.environ.get("GIZI_BACKEND", "").lower() == "palsu"
+
+if BACKEND_PALSU:
+    from tools.sheet_palsu import KlienPalsu
 
-# Mengambil kredensial dari Streamlit Secrets
-creds_dict = st.secrets["gizi_secrets"]
-creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
+    client = KlienPalsu(
+        n_anak=int(os.environ.get("GIZI_PALSU_ANAK", 300)),
+        latensi=float(os.environ.get("GIZI_PALSU_LATENSI", 0)),
+    )
+else:
+    # Mengambil kredensial dari Streamlit Secrets
+    creds_dict = st.secrets["gizi_secrets"]
+    creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
 
-# Menghubungkan ke Google Sheets
-client = gspread.authorize(creds)
+    if st.secrets.get("spreadsheets"):
+        SPREADSHEET_SOURCES = {
+            DESA_DEFAULT: SPREADSHEET_ID,
+            **{str(desa).upper().strip(): sid for desa, sid in st.secrets["spreadsheets"].items()},
+        }
+
+    # Aturan RT/RW -> posyandu untuk desa tambahan, contoh di utils.POSYANDU_DESA
+    if st.secrets.get("posyandu"):
+        atur_posyandu_desa(st.secrets["posyandu"])
+
+    # Menghubungkan ke Google Sheets
+    client = gspread.authorize(creds)
 sheet_balita = client.open_by_key(SPREADSHEET_ID).worksheet(BALITA_SHEET_NAME)
 
+# Kolom sesuai urutan di Google Sheet kamu (Tanpa No)
+BALITA_COLS = ["Nama Anak", "Tanggal Lahir", "Jenis Kelamin", "Nama Ibu",
+               "Desa", "Dusun", "Alamat", "RT", "RW", "Posyandu"]
+
 def load_balita():
-    """Load data balita dari Google Sheet sebagai DataFrame"""
-    data = sheet_balita.get_all_records()
-    df = pd.DataFrame(data)
-    
-    # Kolom sesuai urutan di Google Sheet kamu (Tanpa No)
-    expected_cols = ["Nama Anak", "Tanggal Lahir", "Jenis Kelamin", "Nama Ibu",
-                     "Desa", "Dusun", "Alamat", "RT", "RW", "Posyandu"]
+    """Data balita desa utama sebagai DataFrame (snapshot bersama, tidak membaca sheet tiap rerun)"""
+    return _snapshot_balita(DESA_DEFAULT).snapshot(maks_umur=_maks_umur())
+
+def _muat_ulang_balita():
+    """Sheet Balita baru ditulis: snapshot ditandai basi lalu langsung dimuat ulang"""
+    snapshot = _snapshot_balita(DESA_DEFAULT)
+    snapshot.tandai_berubah()
+    try:
+        snapshot.muat()
+    except Exception as e:
+        # Tetap basi -> dimuat ulang penyegar latar / akses berikutnya
+        print(f"Error memuat ulang data balita: {e}")
+
+def _rapikan_balita(df):
+    """Samakan kolom & tipe data balita hasil get_all_records"""
+    expected_cols = BALITA_COLS
+    df.columns = df.columns.astype(str).str.strip()
     
     if df.empty:
         return pd.DataFrame(columns=expected_cols)
@@ -51,10 +102,11 @@ def insert_balita(data_list):
     # Gunakan append_row langsung untuk memasukkan list tersebut
     try:
         sheet_balita.append_row(data_list)
-        return True
     except Exception as e:
         print(f"Error saat insert data: {e}")
         return False
+    _muat_ulang_balita()
+    return True
     """Tambahkan balita baru ke Google Sheet (Kolom A s/d J)"""
     # Menghapus logika ID otomatis/No, fokus pada data mentah
     row = [
@@ -71,8 +123,32 @@ def insert_balita(data_list):
     ]
     sheet_balita.append_row(row)
 
-def update_balita_by_index(row_index, data_list):
-    """Update berdasarkan urutan baris di Google Sheet menggunakan List data"""
+# Hapus baris Balita menggeser nomor baris di bawahnya, jadi tulis Balita
+# diserialkan per proses dan setiap baris dicek dulu (compare-and-swap isi)
+_kunci_balita = threading.Lock()
+
+def _cek_baris_balita(row_number, balita_lama):
+    """Pastikan baris sheet masih sama dengan data yang dilihat pengguna (satu kali baca)."""
+    header, baris = sheet_balita.batch_get(["1:1", f"{row_number}:{row_number}"])
+    header = [str(h).strip() for h in (header[0] if header else [])]
+    baris = list(baris[0]) if baris else []
+    baris += [""] * (len(header) - len(baris))
+
+    for i, kolom in enumerate(header):
+        if kolom in balita_lama and kolom in BALITA_COLS and kolom != "Posyandu":
+            lama, kini = str(balita_lama[kolom]).strip().upper(), str(baris[i]).strip().upper()
+            if lama != kini:
+                raise KonflikVersi(
+                    f"Data balita {balita_lama.get('Nama Anak', '')} sudah diubah/bergeser "
+                    f"oleh pengguna lain ({kolom}: '{lama}' -> '{kini}'), muat ulang data"
+                )
+
+def update_balita_by_index(row_index, data_list, balita_lama=None):
+    """
+    Update berdasarkan urutan baris di Google Sheet menggunakan List data.
+    balita_lama: data yang dilihat pengguna; bila diisi, update ditolak
+    (KonflikVersi) kalau isi baris di sheet sudah berbeda.
+    """
     # row_index adalah index dataframe (dimulai dari 0)
     # +2 karena baris 1 adalah header di GSheet
     row_number = row_index + 2 
@@ -80,12 +156,25 @@ def update_balita_by_index(row_index, data_list):
     # Update Range A sampai J dengan data_list yang dikirim dari Page 2
     # Kita bungkus data_list dalam list ganda [[]] sesuai aturan library gspread
     range_label = f"A{row_number}:J{row_number}"
-    sheet_balita.update(range_label, [data_list])
+    try:
+        with _kunci_balita:
+            if balita_lama is not None:
+                _cek_baris_balita(row_number, balita_lama)
+            sheet_balita.update(range_label, [data_list])
+    finally:
+        # Berhasil maupun KonflikVersi: snapshot disamakan dengan isi sheet
+        _muat_ulang_balita()
 
-def delete_balita_by_index(row_index):
-    """Hapus baris berdasarkan urutan di Google Sheet"""
+def delete_balita_by_index(row_index, balita_lama=None):
+    """Hapus baris berdasarkan urutan di Google Sheet (dicek dulu seperti update)"""
     row_number = row_index + 2
-    sheet_balita.delete_rows(row_number)
+    try:
+        with _kunci_balita:
+            if balita_lama is not None:
+                _cek_baris_balita(row_number, balita_lama)
+            sheet_balita.delete_rows(row_number)
+    finally:
+        _muat_ulang_balita()
 
 import pandas as pd
 from datetime import date
@@ -93,67 +182,225 @@ from datetime import date
 # ==========================
 # KONFIGURASI SHEET PENGUKURAN
 # ==========================
-PENGUKURAN_SHEET_NAME = "Pengukuran" 
 sheet_pengukuran = client.open_by_key(SPREADSHEET_ID).worksheet(PENGUKURAN_SHEET_NAME)
 
+PENGUKURAN_COLS = ["No", "Nama Anak", "Tanggal Pengukuran", "Umur", "BB", "TB",
+                   "Z-Score BB/U", "Status BB/U", "Z-Score TB/U", "Status TB/U",
+                   "Z-Score BB/TB", "Status BB/TB"]
+
+@st.cache_resource(show_spinner=False)
+def _store_pengukuran(desa):
+    sh = _buka_spreadsheet(SPREADSHEET_SOURCES[desa])
+    ws = sheet_pengukuran if desa == DESA_DEFAULT else sh.worksheet(PENGUKURAN_SHEET_NAME)
+    store = PengukuranStore(ws, PENGUKURAN_COLS)
+    _daftarkan_penyegar(desa, sh, store)
+    return store
+
+def get_pengukuran_store(desa=DESA_DEFAULT):
+    """
+    Satu store Pengukuran per desa, dipakai bersama semua sesi.
+    Store menyimpan snapshot + peta No -> baris sheet, jadi edit/hapus
+    tidak perlu memuat ulang seluruh sheet.
+    """
+    # Desa selalu dikirim posisional agar kunci cache_resource konsisten
+    return _store_pengukuran(desa)
+
 def load_pengukuran():
     try:
-        data = sheet_pengukuran.get_all_records()
-        df = pd.DataFrame(data)
-        
-        # 1. Bersihkan nama kolom dari spasi
-        df.columns = df.columns.str.strip()
-        
-        # 2. Hapus baris yang benar-benar kosong
-        df = df.dropna(how='all').reset_index(drop=True)
-        
-        if df.empty:
-            return pd.DataFrame(columns=["No", "Nama Anak", "Tanggal Pengukuran", "Umur", "BB", "TB", 
-                                       "Z-Score BB/U", "Status BB/U", "Z-Score TB/U", "Status TB/U", 
-                                       "Z-Score BB/TB", "Status BB/TB"])
-
-        # 3. PAKSA kolom 'No' menjadi numerik (agar tidak error str vs int)
-        if "No" in df.columns:
-            df['No'] = pd.to_numeric(df['No'], errors='coerce').fillna(0).astype(int)
-        else:
-            df.insert(0, "No", range(1, len(df) + 1))
-            
-        return df
+        return get_pengukuran_store().snapshot(maks_umur=_maks_umur())
     except Exception as e:
         print(f"Error load: {e}")
         return pd.DataFrame()
 
 def insert_pengukuran(data_list):
     try:
-        # data_list[0] adalah kolom 'No' di GSheet. 
-        # Kita isi dengan nomor baris berikutnya
-        all_vals = sheet_pengukuran.get_all_values()
-        data_list[0] = len(all_vals) 
-        sheet_pengukuran.append_row(data_list, value_input_option="USER_ENTERED")
+        # Kolom 'No' (data_list[0]) diisi ID unik berikutnya oleh store,
+        # tanpa menghitung ulang seluruh isi sheet
+        get_pengukuran_store().insert(data_list)
         return True
     except Exception as e:
         print(f"Error insert: {e}")
         return False
 
-def update_pengukuran_by_id(no_id, data_list):
+def update_pengukuran_by_id(no_id, data_list, versi=None):
     try:
-        # no_id + 1 karena baris 1 adalah header
-        row_num = int(no_id) + 1
-        range_label = f"A{row_num}:L{row_num}"
-        sheet_pengukuran.update(range_label, [data_list], value_input_option="USER_ENTERED")
+        # Baris sheet dicari dari peta ID, bukan no_id + 1.
+        # versi = kolom Versi yang dilihat pengguna (compare-and-swap)
+        get_pengukuran_store().update(no_id, data_list, versi)
         return True
+    except KonflikVersi:
+        # Konflik diteruskan ke halaman agar pengguna tahu harus memuat ulang
+        raise
     except Exception as e:
         print(f"Gagal update: {e}")
         return False
 
-def delete_pengukuran_by_id(no_id):
+def delete_pengukuran_by_id(no_id, versi=None):
     try:
-        row_num = int(no_id) + 1
-        sheet_pengukuran.delete_rows(row_num)
+        # Soft delete (tombstone): baris lain tidak bergeser
+        get_pengukuran_store().hapus(no_id, versi)
         return True
+    except KonflikVersi:
+        raise
     except Exception as e:
         print(f"Gagal hapus: {e}")
 
         return False
 
 
+# ==========================
+# MULTI DESA (BEBERAPA SPREADSHEET)
+# ==========================
+CACHE_TTL = 300  # detik, umur cache data per sumber
+INTERVAL_CEK = 30  # detik, jeda penyegar latar mengecek waktu ubah spreadsheet
+
+@st.cache_resource(show_spinner=False)
+def _buka_spreadsheet(spreadsheet_id):
+    """Buka spreadsheet sekali per proses, dipakai bersama semua sesi"""
+    return client.open_by_key(spreadsheet_id)
+
+@st.cache_resource(show_spinner=False)
+def _penyegar():
+    """
+    Satu thread penyegar per proses. Selama hidup, halaman langsung memakai
+    snapshot terakhir (tidak ada rerun yang menunggu unduhan sheet);
+    penyegar yang memuat ulang di latar bila spreadsheet berubah.
+    """
+    return PenyegarLatar(interval=INTERVAL_CEK, maks_umur=CACHE_TTL)
+
+def _daftarkan_penyegar(desa, sh, snapshot):
+    penyegar = _penyegar()
+    penyegar.daftarkan(desa, sh, snapshot)
+    penyegar.mulai()
+
+def _maks_umur():
+    # Penyegar mati (mis. thread error) -> kembali ke TTL biasa
+    return None if _penyegar().hidup() else CACHE_TTL
+
+@st.cache_resource(show_spinner=False)
+def _snapshot_balita(desa):
+    sh = _buka_spreadsheet(SPREADSHEET_SOURCES[desa])
+    snapshot = SnapshotLembar(sh.worksheet(BALITA_SHEET_NAME), _rapikan_balita)
+    _daftarkan_penyegar(desa, sh, snapshot)
+    return snapshot
+
+def _load_balita_desa(desa):
+    """Snapshot sheet Balita milik satu desa (dipakai bersama semua sesi)."""
+    df = _snapshot_balita(desa).snapshot(maks_umur=_maks_umur())
+    # Sumber data menentukan desa, bukan isian manual di sheet
+    df["Desa"] = desa
+    return df
+
+def _load_pengukuran_desa(desa):
+    """Snapshot Pengukuran satu desa dari store-nya (ikut perubahan terbaru)"""
+    df = get_pengukuran_store(desa).snapshot(maks_umur=_maks_umur())
+    df["Desa"] = desa
+    return df
+
+def umur_data(daftar_desa):
+    """
+    Detik sejak data desa-desa ini terakhir dipastikan terkini (terlama
+    di antara desa). None bila ada desa yang belum selesai dimuat.
+    """
+    penyegar = _penyegar()
+    umur = [penyegar.umur(d) for d in daftar_desa if d in SPREADSHEET_SOURCES]
+    if not umur or any(u is None for u in umur):
+        return None
+    return max(umur)
+
+def teks_umur_data(daftar_desa):
+    """Keterangan kesegaran data untuk ditampilkan di halaman"""
+    umur = umur_data(daftar_desa)
+    if umur is None:
+        return "🔄 Data sheet sedang dimuat..."
+    if umur < 60:
+        teks = f"{umur:.0f} detik"
+    elif umur < 3600:
+        teks = f"{umur / 60:.0f} menit"
+    else:
+        teks = f"{umur / 3600:.1f} jam"
+    ikon = "🟢" if umur <= INTERVAL_CEK * 3 else "🟠"
+    return f"{ikon} Data sheet dicek {teks} lalu"
+
+def revisi_data(daftar_desa):
+    """
+    Penanda versi data per desa. Berubah setiap kali store Pengukuran / snapshot
+    Balita dimuat ulang atau ada insert/update/hapus; dipakai sebagai kunci cache analitik.
+    """
+    return tuple((d, get_pengukuran_store(d).revisi, _snapshot_balita(d).revisi)
+                 for d in daftar_desa if d in SPREADSHEET_SOURCES)
+
+_LOADER_DESA = {
+    BALITA_SHEET_NAME: _load_balita_desa,
+    PENGUKURAN_SHEET_NAME: _load_pengukuran_desa,
+}
+
+def load_multi_desa(daftar_desa=None):
+    """
+    Load Balita & Pengukuran dari beberapa desa secara paralel.
+    Hanya desa yang diminta yang diambil; desa lain tetap di cache masing-masing.
+    Return (df_balita, df_pengukuran) gabungan dengan kolom "Desa".
+    """
+    if daftar_desa is None:
+        daftar_desa = list(SPREADSHEET_SOURCES)
+    daftar_desa = [d for d in daftar_desa if d in SPREADSHEET_SOURCES]
+
+    tugas = [(d, s) for d in daftar_desa for s in (BALITA_SHEET_NAME, PENGUKURAN_SHEET_NAME)]
+    hasil = {}
+
+    if tugas:
+        # Thread pekerja perlu context Streamlit agar st.cache_data berjalan normal
+        ctx = get_script_run_ctx()
+        with ThreadPoolExecutor(max_workers=min(8, len(tugas)),
+                                initializer=add_script_run_ctx, initargs=(None, ctx)) as ex:
+            futures = {ex.submit(_LOADER_DESA[s], d): (d, s) for d, s in tugas}
+            for fut in as_completed(futures):
+                desa, nama_sheet = futures[fut]
+                try:
+                    hasil[(desa, nama_sheet)] = fut.result()
+                except Exception as e:
+                    print(f"Error load {nama_sheet} desa {desa}: {e}")
+
+    def _gabung(nama_sheet, cols):
+        # Urutan gabungan mengikuti urutan desa, bukan urutan selesai thread
+        frames = [hasil[(d, nama_sheet)] for d in daftar_desa
+                  if (d, nama_sheet) in hasil and not hasil[(d, nama_sheet)].empty]
+        if not frames:
+            return pd.DataFrame(columns=cols)
+        return pd.concat(frames, ignore_index=True)
+
+    df_balita = _gabung(BALITA_SHEET_NAME, BALITA_COLS)
+    df_pengukuran = _gabung(PENGUKURAN_SHEET_NAME, PENGUKURAN_COLS + ["Desa"])
+    return df_balita, df_pengukuran
+
+
+# ==========================
+# ROLLUP DASHBOARD PER DESA
+# ==========================
+@st.cache_resource(show_spinner=False)
+def _rollup_desa(desa):
+    """Satu rollup per desa, terdaftar di store sehingga ikut setiap perubahan data"""
+    store = get_pengukuran_store(desa)
+    cube = RollupCube(_peta_posyandu(desa))
+    store.segarkan(maks_umur=_maks_umur())
+    store.tambah_pendengar(cube)
+    return cube
+
+def _peta_posyandu(desa):
+    """Nama Anak -> Posyandu dari snapshot Balita desa (_load_balita_desa)"""
+    df = _load_balita_desa(desa)
+    if df.empty:
+        return {}
+    posyandu = map_posyandu_series(df["RT"], df["RW"], df["Desa"], df.get("Posyandu"))
+    return dict(zip(df["Nama Anak"], posyandu.fillna(TIDAK_TERDAFTAR)))
+
+def get_rollup(desa=DESA_DEFAULT):
+    """
+    Rollup metrik dashboard (posyandu x bulan x status) satu desa.
+    Dibangun sekali per muat sheet, lalu diperbarui per insert/update/hapus.
+    """
+    cube = _rollup_desa(desa)
+    # Muat ulang store bila snapshot sudah kedaluwarsa (rollup ikut disinkron)
+    get_pengukuran_store(desa).segarkan(maks_umur=_maks_umur())
+    cube.atur_peta_posyandu(_peta_posyandu(desa))
+    return cube
@@ -0,0 +1,271 @@
+# ============================== laporan_utils.py ==============================
+
+import io
+
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.drawing.image import Image as XLImage
+from openpyxl.styles import Font, PatternFill
+
+from query_utils import siapkan_pengukuran
+
+# ======================================================
+# LAPORAN BULANAN POSYANDU (XLSX & PDF)
+# ======================================================
+# - Satu blok per posyandu x bulan: daftar anak yang diukur + rekap status
+# - XLSX ditulis dengan Workbook(write_only=True): baris dialirkan langsung
+#   ke file, memori tidak tumbuh mengikuti jumlah sel
+# - Grafik rekap digambar sekali per laporan lalu dipakai ulang (XLSX & PDF)
+
+INDIKATOR_LAPORAN = ["Status BB/U", "Status TB/U", "Status BB/TB"]
+KOLOM_DAFTAR = ["Nama Anak", "Desa", "Tanggal Pengukuran", "Umur", "BB", "TB"] + INDIKATOR_LAPORAN
+BARIS_PER_HALAMAN_PDF = 35
+NAMA_BULAN = ["Januari", "Februari", "Maret", "April", "Mei", "Juni", "Juli",
+              "Agustus", "September", "Oktober", "November", "Desember"]
+
+_FONT_JUDUL = Font(bold=True, size=13)
+_FONT_HEADER = Font(bold=True, color="FFFFFF")
+_ISI_HEADER = PatternFill("solid", fgColor="2E7D32")
+
+
+def label_periode(periode):
+    """'2025-03' -> 'Maret 2025'"""
+    tahun, bulan = str(periode).split("-")
+    return f"{NAMA_BULAN[int(bulan) - 1]} {tahun}"
+
+
+def siapkan_laporan(df_pengukuran, df_balita=None, tahun=None, bulan=None, posyandu=None):
+    """
+    Satu baris per anak per posyandu-bulan (pengukuran terakhir di bulan itu).
+    Diurutkan Posyandu, Periode, Nama Anak agar bisa ditulis berurutan.
+    """
+    if df_pengukuran.empty:
+        return pd.DataFrame(columns=["Posyandu", "Periode"] + KOLOM_DAFTAR)
+
+    df = siapkan_pengukuran(df_pengukuran, df_balita)
+    df = df.dropna(subset=["_tanggal"])
+    if "Posyandu" not in df.columns:
+        df["Posyandu"] = "Tidak Terdaftar"
+    if "Desa" not in df.columns:
+        df["Desa"] = ""
+
+    mask = pd.Series(True, index=df.index)
+    if tahun is not None:
+        mask &= df["_tanggal"].dt.year == int(tahun)
+    if bulan is not None:
+        mask &= df["_tanggal"].dt.month == int(bulan)
+    if posyandu:
+        mask &= df["Posyandu"].isin(posyandu if isinstance(posyandu, (list, tuple, set)) else [posyandu])
+    df = df[mask]
+
+    kode = df["_tanggal"].dt.year * 100 + df["_tanggal"].dt.month
+    df = df.assign(Periode=kode.map({k: f"{k // 100}-{k % 100:02d}" for k in kode.unique()}))
+
+    df = df.sort_values(["Posyandu", "Periode", "Desa", "Nama Anak", "_tanggal"])
+    df = df.drop_duplicates(subset=["Posyandu", "Periode", "Desa", "Nama Anak"], keep="last")
+    return df[["Posyandu", "Periode"] + KOLOM_DAFTAR].reset_index(drop=True)
+
+
+def rekap_status(df_laporan):
+    """Jumlah anak per Posyandu, Periode, Indikator, Status (format panjang)"""
+    bagian = []
+    for kolom in INDIKATOR_LAPORAN:
+        jumlah = df_laporan.groupby(["Posyandu", "Periode", kolom]).size()
+        jumlah.index = jumlah.index.set_names("Status", level=2)
+        bagian.append(jumlah.reset_index(name="Jumlah").assign(Indikator=kolom.replace("Status ", "")))
+    if not bagian or df_laporan.empty:
+        return pd.DataFrame(columns=["Posyandu", "Periode", "Indikator", "Status", "Jumlah"])
+    return pd.concat(bagian, ignore_index=True)[["Posyandu", "Periode", "Indikator", "Status", "Jumlah"]]
+
+
+def gambar_grafik(rekap, judul="Rekap Status Gizi"):
+    """Satu figure rekap (status terbanyak per indikator, per posyandu). Dipanggil sekali per laporan."""
+    fig, axes = plt.subplots(1, 3, figsize=(15, 4.5))
+    for ax, indikator in zip(axes, ["BB/U", "TB/U", "BB/TB"]):
+        data = rekap[rekap["Indikator"] == indikator]
+        if data.empty:
+            ax.set_axis_off()
+            continue
+        pivot = data.pivot_table(index="Posyandu", columns="Status", values="Jumlah", aggfunc="sum", fill_value=0)
+        pivot.plot(kind="bar", stacked=True, ax=ax, legend=True, width=0.7)
+        ax.set_title(indikator)
+        ax.set_xlabel("")
+        ax.set_ylabel("Jumlah Anak")
+        ax.tick_params(axis="x", rotation=30)
+        ax.legend(fontsize=7, loc="upper right")
+    fig.suptitle(judul)
+    fig.tight_layout()
+    return fig
+
+
+def _png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=110)
+    buffer.seek(0)
+    return buffer
+
+
+# ---------------- XLSX (WRITE-ONLY) ----------------
+def _sel(ws, nilai, font=None, isi=None):
+    cell = WriteOnlyCell(ws, value=nilai)
+    if font is not None:
+        cell.font = font
+    if isi is not None:
+        cell.fill = isi
+    return cell
+
+
+def _header(ws, kolom):
+    return [_sel(ws, k, _FONT_HEADER, _ISI_HEADER) for k in kolom]
+
+
+def tulis_xlsx(df_laporan, rekap, target, judul="Laporan Bulanan Posyandu", fig=None):
+    """
+    Sheet 'Ringkasan' (tabel rekap + grafik) lalu satu sheet per posyandu.
+    target: path atau file-like (BytesIO).
+    """
+    wb = Workbook(write_only=True)
+
+    ws = wb.create_sheet("Ringkasan")
+    ws.append([_sel(ws, judul, _FONT_JUDUL)])
+    ws.append([])
+    ws.append(_header(ws, ["Posyandu", "Bulan", "Indikator", "Status", "Jumlah Anak"]))
+    for pos, periode, indikator, status, jumlah in rekap.itertuples(index=False, name=None):
+        ws.append([pos, label_periode(periode), indikator, status, int(jumlah)])
+    if fig is not None:
+        gambar = XLImage(_png(fig))
+        gambar.anchor = "G3"
+        ws.add_image(gambar)
+
+    rekap_grup = {k: g for k, g in rekap.groupby(["Posyandu", "Periode"], sort=False)}
+    for pos, df_pos in df_laporan.groupby("Posyandu", sort=False):
+        ws = wb.create_sheet(str(pos)[:31])
+        for periode, df_bulan in df_pos.groupby("Periode", sort=False):
+            ws.append([_sel(ws, f"{pos} - {label_periode(periode)}", _FONT_JUDUL)])
+            ws.append(_header(ws, ["No"] + KOLOM_DAFTAR))
+            for i, baris in enumerate(df_bulan[KOLOM_DAFTAR].itertuples(index=False, name=None), start=1):
+                ws.append([i, *baris])
+
+            ws.append([])
+            ws.append(_header(ws, ["Indikator", "Status", "Jumlah Anak"]))
+            for _, indikator, status, jumlah in rekap_grup[(pos, periode)][
+                    ["Periode", "Indikator", "Status", "Jumlah"]].itertuples(index=False, name=None):
+                ws.append([indikator, status, int(jumlah)])
+            ws.append([f"Total anak diukur: {len(df_bulan)}"])
+            ws.append([])
+
+    wb.save(target)
+
+
+# ---------------- PDF (MATPLOTLIB PdfPages) ----------------
+# Tabel tidak digambar dengan ax.table (lambat, 0,2-3 detik per halaman):
+# satu halaman = satu blok teks monospace. Figure halaman dipakai ulang untuk
+# semua halaman.
+
+_A4_LANDSCAPE = (11.69, 8.27)        # inci
+
+
+class _HalamanTeks:
+    """Satu figure A4 yang isinya diganti per halaman lalu disimpan ke PdfPages.
+
+    Halaman yang teksnya muat di cp1252 (hampir semua nama) ditulis dengan
+    font inti PDF Courier, tanpa embed glyph, ~20x lebih cepat. Halaman lain
+    memakai DejaVu Sans Mono (glyph di-embed) supaya huruf non-Latin tetap
+    tampil; karakter yang tidak ada di DejaVu (mis. emoji) tetap kosong.
+    """
+
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self.fig = plt.figure(figsize=_A4_LANDSCAPE)
+        self._judul = self.fig.text(0.05, 0.94, "", fontsize=12, weight="bold")
+        self._isi = self.fig.text(0.05, 0.90, "", fontsize=8, va="top", linespacing=1.45)
+
+    def tulis(self, judul, baris, ukuran=8):
+        isi = "\n".join(baris)
+        try:
+            (judul + isi).encode("cp1252")
+            inti = True
+        except UnicodeEncodeError:
+            inti = False
+        for t in (self._judul, self._isi):
+            t.set_family("Courier" if inti else "DejaVu Sans Mono")
+        # Courier inti hanya punya bobot "medium"; DejaVu hanya "normal"
+        self._isi.set_weight("medium" if inti else "normal")
+        self._judul.set_text(judul)
+        self._isi.set_text(isi)
+        self._isi.set_fontsize(ukuran)
+        with plt.rc_context({"pdf.use14corefonts": inti}):
+            self.pdf.savefig(self.fig)
+
+    def tutup(self):
+        plt.close(self.fig)
+
+
+def _format_tabel(kolom, baris):
+    """Baris teks lebar tetap (header, garis, isi)"""
+    teks = [[str(k) for k in kolom]] + [["" if pd.isna(v) else str(v) for v in b] for b in baris]
+    lebar = [max(len(r[i]) for r in teks) for i in range(len(kolom))]
+    garis = "  ".join("-" * w for w in lebar)
+    baris_teks = ["  ".join(v.ljust(w) for v, w in zip(r, lebar)) for r in teks]
+    return [baris_teks[0], garis] + baris_teks[1:]
+
+
+def tulis_pdf(df_laporan, rekap, target, judul="Laporan Bulanan Posyandu", fig=None):
+    """Halaman grafik ringkasan, lalu daftar anak + rekap tiap posyandu-bulan (dipecah per halaman)."""
+    rekap_grup = {k: g for k, g in rekap.groupby(["Posyandu", "Periode"], sort=False)}
+    with PdfPages(target, metadata={"Title": judul}) as pdf:
+        if fig is not None:
+            pdf.savefig(fig)
+
+        halaman = _HalamanTeks(pdf)
+        try:
+            # PdfPages tanpa halaman = file 0 byte, jadi selalu ada minimal satu halaman
+            if df_laporan.empty:
+                halaman.tulis(judul, ["Tidak ada data pengukuran untuk pilihan ini."], ukuran=10)
+            for (pos, periode), df_bulan in df_laporan.groupby(["Posyandu", "Periode"], sort=False):
+                judul_blok = f"{pos} - {label_periode(periode)}"
+                baris = [[i, *b] for i, b in enumerate(df_bulan[KOLOM_DAFTAR].itertuples(index=False, name=None), start=1)]
+                for awal in range(0, len(baris), BARIS_PER_HALAMAN_PDF):
+                    halaman.tulis(judul_blok, _format_tabel(["No"] + KOLOM_DAFTAR, baris[awal:awal + BARIS_PER_HALAMAN_PDF]))
+
+                rekap_blok = rekap_grup[(pos, periode)][["Indikator", "Status", "Jumlah"]]
+                halaman.tulis(f"{judul_blok} - Rekap Status ({len(df_bulan)} anak)",
+                              _format_tabel(["Indikator", "Status", "Jumlah Anak"], rekap_blok.values.tolist()), ukuran=10)
+        finally:
+            halaman.tutup()
+
+
+def buat_laporan(df_pengukuran, df_balita=None, tahun=None, bulan=None, posyandu=None, format_=("xlsx", "pdf")):
+    """
+    Bangun laporan sekali jalan. Return dict {format: bytes}, atau {} bila
+    tidak ada pengukuran pada tahun/bulan/posyandu yang dipilih.
+    Grafik digambar sekali dan dipakai oleh semua format.
+    """
+    df_laporan = siapkan_laporan(df_pengukuran, df_balita, tahun, bulan, posyandu)
+    if df_laporan.empty:
+        return {}
+    rekap = rekap_status(df_laporan)
+
+    judul = "Laporan Bulanan Posyandu"
+    if tahun is not None:
+        judul += f" {NAMA_BULAN[int(bulan) - 1] + ' ' if bulan else ''}{tahun}"
+
+    fig = gambar_grafik(rekap, judul) if not rekap.empty else None
+    hasil = {}
+    try:
+        for fmt in format_:
+            buffer = io.BytesIO()
+            if fmt == "xlsx":
+                tulis_xlsx(df_laporan, rekap, buffer, judul, fig)
+            elif fmt == "pdf":
+                tulis_pdf(df_laporan, rekap, buffer, judul, fig)
+            else:
+                raise ValueError(f"Format laporan tidak dikenal: {fmt}")
+            hasil[fmt] = buffer.getvalue()
+    finally:
+        if fig is not None:
+            plt.close(fig)
+    return hasil
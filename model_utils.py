@@ -0,0 +1,74 @@
+# ============================== model_utils.py ==============================
+
+import os
+
+import pandas as pd
+import streamlit as st
+import utils
+from fitur_utils import FITUR_MODEL, bangun_fitur
+
+# ======================================================
+# LAYANAN MODEL PREDIKSI FREKUENSI KUNJUNGAN
+# ======================================================
+# Model dimuat sekali per proses (cache_resource) dan dipakai untuk
+# memprediksi seluruh anak dalam satu panggilan predict.
+
+@st.cache_resource(show_spinner=False)
+def _muat_model(path, mtime):
+    # mtime ikut jadi kunci cache: file model diganti -> otomatis dimuat ulang
+    return utils.load_model(path)
+
+def get_model():
+    path = utils.cari_model_terbaru()
+    if not os.path.exists(path):
+        return None
+    return _muat_model(path, os.path.getmtime(path))
+
+
+def kolom_fitur(model):
+    """Urutan kolom yang dipakai saat model dilatih"""
+    nama = getattr(model, "feature_names_in_", None)
+    return list(nama) if nama is not None else list(FITUR_MODEL)
+
+
+def validasi_fitur(X, model):
+    """Pastikan semua kolom fitur model tersedia & numerik. Return X terurut sesuai model."""
+    kolom = kolom_fitur(model)
+    hilang = [k for k in kolom if k not in X.columns]
+    if hilang:
+        raise ValueError(f"Fitur untuk model tidak lengkap: {', '.join(hilang)}")
+
+    X = X[kolom].apply(pd.to_numeric, errors="coerce")
+    kosong = X.columns[X.isna().any()].tolist()
+    if kosong:
+        raise ValueError(f"Fitur berisi nilai kosong/non-numerik: {', '.join(kosong)}")
+
+    n_model = getattr(model, "n_features_in_", len(kolom))
+    if n_model != len(kolom):
+        raise ValueError(f"Model butuh {n_model} fitur, tersedia {len(kolom)}")
+    return X
+
+
+def prediksi_batch(X):
+    """Prediksi seluruh baris X dalam satu panggilan predict"""
+    model = get_model()
+    if model is None:
+        raise ValueError("Model ML belum tersedia")
+    return utils.prediksi_frekuensi(validasi_fitur(X, model), model=model)
+
+
+@st.cache_data(show_spinner=False)
+def prediksi_semua_anak(_df_pengukuran, _df_balita, revisi, tanggal_acuan):
+    """
+    Prediksi frekuensi kunjungan untuk semua anak.
+    Cache dikunci revisi data + tanggal acuan (fitur bulan_sejak_kunjungan
+    bergantung hari ini), DataFrame tidak di-hash.
+    _df_pengukuran: data mentah seperti ekspor yang dipakai train_model.py.
+    """
+    fitur = bangun_fitur(_df_pengukuran, _df_balita, tanggal_acuan)
+    if fitur.empty:
+        return pd.DataFrame(columns=["Prediksi Frekuensi"])
+
+    hasil = fitur.copy()
+    hasil["Prediksi Frekuensi"] = prediksi_batch(fitur)
+    return hasil.reset_index()
@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-from gsheet_utils import client, SPREADSHEET_ID #
+from datetime import date
+import gsheet_utils
+from analitik_utils import anak_berisiko
 
 # 1. Konfigurasi Halaman
 st.set_page_config(
@@ -10,65 +12,123 @@ st.set_page_config(
 )
 
 # 2. Fungsi Load Data
-def load_data():
+def load_data(daftar_desa):
     try:
-        sh = client.open_by_key(SPREADSHEET_ID)
-        # Ambil data Balita
-        df_balita = pd.DataFrame(sh.worksheet("Balita").get_all_records())
-        df_balita.columns = df_balita.columns.str.strip()
-        
-        # Ambil data Pengukuran
-        df_ukur = pd.DataFrame(sh.worksheet("Pengukuran").get_all_records())
-        df_ukur.columns = df_ukur.columns.str.strip()
-        
-        return df_balita, df_ukur
+        # Tiap desa di-cache terpisah, jadi ganti filter tidak memuat ulang desa lain
+        return gsheet_utils.load_multi_desa(daftar_desa)
     except Exception as e:
         st.error(f"Gagal memuat data: {e}")
         return pd.DataFrame(), pd.DataFrame()
 
-# 3. Jalankan Load Data
-df_balita, df_ukur = load_data()
+# 3. Filter Desa & Jalankan Load Data
+semua_desa = list(gsheet_utils.SPREADSHEET_SOURCES)
+desa_pilihan = st.sidebar.multiselect("🏘️ Filter Desa", semua_desa, default=semua_desa)
+df_balita, df_ukur = load_data(desa_pilihan)
+st.sidebar.caption(gsheet_utils.teks_umur_data(desa_pilihan))
+
+@st.cache_data(show_spinner=False)
+def hitung_anak_berisiko(_df_ukur, revisi, tanggal_acuan):
+    # _df_ukur tidak di-hash; cache cukup dikunci revisi data + tanggal hari ini
+    return anak_berisiko(_df_ukur, tanggal_acuan)
 
 # 4. Tampilan Dashboard
 st.title("📊 Dashboard Monitoring Gizi Balita")
 
 if not df_balita.empty:
+    # --- ROLLUP PER DESA (tanpa memindai riwayat pengukuran) ---
+    rollup = {}
+    for desa in desa_pilihan:
+        try:
+            rollup[desa] = gsheet_utils.get_rollup(desa)
+        except Exception as e:
+            st.warning(f"Rollup desa {desa} gagal dimuat: {e}")
+
+    daftar_posyandu = sorted({(d, p) for d, cube in rollup.items() for p in cube.daftar_posyandu()})
+    # Opsi berupa label teks (bukan tuple) agar nilai widget stabil antar rerun
+    opsi_pos = {"Semua Posyandu": None, **{f"{p} ({d})": (d, p) for d, p in daftar_posyandu}}
+    pilihan_pos = opsi_pos[st.sidebar.selectbox("🏥 Posyandu", list(opsi_pos))]
+
+    def _cube_terpilih():
+        """(cube, posyandu) sesuai drill-down; posyandu None = seluruh desa"""
+        if pilihan_pos is None:
+            return [(cube, None) for cube in rollup.values()]
+        return [(rollup[pilihan_pos[0]], pilihan_pos[1])]
+
+    def status_terakhir(indikator):
+        bagian = [cube.status_terakhir(indikator, pos) for cube, pos in _cube_terpilih()]
+        return pd.concat(bagian).groupby(level=0).sum() if bagian else pd.Series(dtype=int)
+
     # --- METRIK UTAMA ---
-    c1, c2 = st.columns(2)
+    status_bbtb = status_terakhir("BB/TB")
+    status_tbu = status_terakhir("TB/U")
+    jumlah_terukur = sum(cube.jumlah_anak(pos) for cube, pos in _cube_terpilih())
+
+    c1, c2, c3, c4 = st.columns(4)
     with c1:
         st.metric("👶 Total Balita", len(df_balita))
     with c2:
-        # Gunakan nama kolom persis sesuai GSheet Anda
-        kolom_status = "Status BB/TB"
-        if kolom_status in df_ukur.columns:
-            buruk = len(df_ukur[df_ukur[kolom_status] == "Gizi Buruk"])
-            st.metric("⚠️ Balita Gizi Buruk", buruk)
+        st.metric("📏 Balita Terukur", jumlah_terukur)
+    with c3:
+        # Status pengukuran terakhir tiap anak, bukan jumlah baris riwayat
+        st.metric("⚠️ Balita Gizi Buruk", int(status_bbtb.get("Gizi Buruk", 0)))
+    with c4:
+        st.metric("📉 Balita Stunting", int(status_tbu.get("Pendek", 0) + status_tbu.get("Sangat Pendek", 0)))
+
+    if not status_bbtb.empty:
+        st.caption("Sebaran status BB/TB (pengukuran terakhir)")
+        st.bar_chart(status_bbtb)
+
+    st.divider()
+
+    # --- DETEKSI DINI: ANAK BERISIKO ---
+    st.subheader("🚩 Balita Perlu Perhatian")
+    if not df_ukur.empty:
+        df_risiko = hitung_anak_berisiko(df_ukur, gsheet_utils.revisi_data(desa_pilihan), date.today())
+        if df_risiko.empty:
+            st.success("Tidak ada balita dengan tanda gagal tumbuh atau absen.")
         else:
-            st.warning(f"Kolom '{kolom_status}' tidak ditemukan")
+            st.caption("Z-score BB/U turun berturut-turut, BB tidak naik, atau tidak datang ke posyandu.")
+            df_tampil = df_risiko.copy()
+            df_tampil["Kunjungan Terakhir"] = df_tampil["Tanggal Pengukuran"].dt.strftime("%d-%m-%Y")
+            kolom_risiko = ["Nama Anak", "Desa", "Kunjungan Terakhir", "Status BB/U",
+                            "Delta Z BB/U", "Velocity BB", "Alasan"]
+            st.dataframe(df_tampil[[k for k in kolom_risiko if k in df_tampil.columns]].round(2),
+                         use_container_width=True, hide_index=True, height=300)
+            st.write(f"Total: {len(df_risiko)} anak")
+    else:
+        st.info("Data pengukuran belum tersedia.")
 
     st.divider()
 
     # --- GRAFIK TREN ---
-    st.subheader("📈 Tren Kunjungan Balita per Tahun")
-    kolom_tgl = "Tanggal Pengukuran" #
-    
-    if kolom_tgl in df_ukur.columns and not df_ukur.empty:
-        # Konversi tanggal dan bersihkan data kosong
-        df_ukur[kolom_tgl] = pd.to_datetime(df_ukur[kolom_tgl], errors='coerce')
-        df_ukur = df_ukur.dropna(subset=[kolom_tgl])
-        
-        # Agregasi per tahun
-        df_ukur["Tahun"] = df_ukur[kolom_tgl].dt.year
-        df_tren = df_ukur.groupby("Tahun").size().reset_index(name="Jumlah")
-        
+    st.subheader("📈 Tren Kunjungan Balita")
+    bagian = [cube.kunjungan_per_bulan(pos) for cube, pos in _cube_terpilih()]
+    df_bulan = pd.concat(bagian).groupby("Periode").sum() if bagian else pd.DataFrame()
+
+    if not df_bulan.empty:
+        mode_tren = st.radio("Periode", ["Per Tahun", "Per Bulan"], horizontal=True)
+        if mode_tren == "Per Tahun":
+            df_tren = df_bulan.groupby(df_bulan.index.str[:4])["Kunjungan"].sum()
+        else:
+            df_tren = df_bulan["Kunjungan"]
+
         # Visualisasi 
         fig, ax = plt.subplots(figsize=(10, 4))
-        ax.plot(df_tren["Tahun"].astype(str), df_tren["Jumlah"], marker='o', color='#1f77b4', linewidth=2)
-        ax.set_xlabel("Tahun")
+        ax.plot(df_tren.index, df_tren.values, marker='o', color='#1f77b4', linewidth=2)
+        ax.set_xlabel("Tahun" if mode_tren == "Per Tahun" else "Bulan")
         ax.set_ylabel("Jumlah Kunjungan")
         ax.grid(True, linestyle='--', alpha=0.6)
+        if mode_tren == "Per Bulan":
+            ax.xaxis.set_major_locator(plt.MaxNLocator(12))
+            fig.autofmt_xdate()
         
         st.pyplot(fig)
+
+        with st.expander("📊 Status BB/TB per Bulan"):
+            bagian = [cube.status_per_bulan("BB/TB", pos) for cube, pos in _cube_terpilih()]
+            df_status = pd.concat(bagian).groupby(level=0).sum().fillna(0) if bagian else pd.DataFrame()
+            if not df_status.empty:
+                st.area_chart(df_status)
     else:
         st.info("Data pengukuran belum tersedia untuk grafik.")
 else:
@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 from datetime import date
 from utils import map_posyandu
+from query_utils import siapkan_balita, query_balita, jumlah_halaman
 import gsheet_utils
 
 # ==========================
@@ -16,6 +17,8 @@ if "df_view" not in st.session_state:
 def refresh_data():
     st.session_state.df_view = gsheet_utils.load_balita()
 
+st.sidebar.caption(gsheet_utils.teks_umur_data([gsheet_utils.DESA_DEFAULT]))
+
 # ==========================
 # FORM INPUT BALITA BARU
 # ==========================
@@ -84,26 +87,39 @@ if submit_input:
 # TABEL DATA BALITA
 # ==========================
 st.subheader("📋 Data Balita Terdaftar")
-df_display = st.session_state.df_view.copy()
 
-if not df_display.empty:
-    def apply_mapping(row):
-        try: return map_posyandu(row['RT'], row['RW'])
-        except: return "Tidak Terdaftar"
+@st.cache_data(show_spinner=False)
+def siapkan_tabel_balita(df_view):
+    # Index asli (urutan baris GSheet) dipertahankan untuk edit/hapus
+    df = siapkan_balita(df_view)
+    return df.drop_duplicates(subset=["Nama Anak", "Nama Ibu", "Tanggal Lahir"], keep="first")
 
-    df_display['Posyandu'] = df_display.apply(apply_mapping, axis=1)
+df_unique = siapkan_tabel_balita(st.session_state.df_view)
 
-    df_unique = df_display.drop_duplicates(
-        subset=["Nama Anak", "Nama Ibu", "Tanggal Lahir"], 
-        keep="first"
-    ).sort_values("Nama Anak").reset_index(drop=True)
-    
-    df_unique.insert(0, 'No.', range(1, len(df_unique) + 1))
+if not df_unique.empty:
+    f1, f2, f3 = st.columns([2, 1.2, 0.8])
+    cari = f1.text_input("🔍 Cari Nama Anak / Nama Ibu (awalan)")
+    opsi_posyandu = ["Semua"] + sorted(df_unique["Posyandu"].unique().tolist())
+    pos_pilih = f2.selectbox("Posyandu", opsi_posyandu)
+    page_size = f3.selectbox("Baris / halaman", [25, 50, 100], index=1)
+
+    # Hanya satu halaman yang dikirim ke browser
+    df_page, total = query_balita(df_unique, posyandu=None if pos_pilih == "Semua" else pos_pilih,
+                                  prefix_nama=cari, page=st.session_state.get("hal_balita", 1),
+                                  page_size=page_size)
+    n_halaman = jumlah_halaman(total, page_size)
+    if st.session_state.get("hal_balita", 1) > n_halaman:
+        st.session_state.hal_balita = n_halaman
+    halaman = st.session_state.get("hal_balita", 1)
+    df_page = df_page.copy()
+    df_page.insert(0, 'No.', range((halaman - 1) * page_size + 1, (halaman - 1) * page_size + len(df_page) + 1))
     
     # Tampilkan kolom sesuai urutan visual yang diinginkan
     kolom_tampil = ["No.", "Nama Anak", "Nama Ibu", "Tanggal Lahir", "Jenis Kelamin", "Posyandu", "Dusun", "Alamat"]
     
-    st.dataframe(df_unique[kolom_tampil], use_container_width=True, height=400, hide_index=True)
+    st.dataframe(df_page[kolom_tampil], use_container_width=True, height=400, hide_index=True)
+    st.number_input(f"Halaman (dari {n_halaman})", min_value=1, max_value=n_halaman, step=1, key="hal_balita")
+    st.caption(f"Menampilkan {len(df_page)} dari {total} balita")
 else:
     st.info("Belum ada data balita.")
 
@@ -113,26 +129,18 @@ else:
 st.divider()
 st.subheader("✏️ Edit / Hapus Data Balita")
 
-if not df_display.empty:
-    list_pilihan = df_unique.index.tolist()
+if not df_unique.empty and not df_page.empty:
+    # Pilihan hanya dari halaman yang sedang tampil (gunakan pencarian di atas)
+    list_pilihan = df_page.index.tolist()
     selected_idx = st.selectbox(
         "Pilih Balita yang ingin dikelola",
         list_pilihan,
-        format_func=lambda i: f"{df_unique.loc[i, 'Nama Anak']} (Ibu: {df_unique.loc[i, 'Nama Ibu']})"
+        format_func=lambda i: f"{df_page.loc[i, 'Nama Anak']} (Ibu: {df_page.loc[i, 'Nama Ibu']})"
     )
     
-    balita_sel = df_unique.loc[selected_idx]
-    
-    try:
-        # Mencari index asli di df_display (GSheet)
-        original_index = df_display[
-            (df_display["Nama Anak"] == balita_sel["Nama Anak"]) & 
-            (df_display["Nama Ibu"] == balita_sel["Nama Ibu"]) &
-            (df_display["Tanggal Lahir"] == balita_sel["Tanggal Lahir"])
-        ].index[0]
-    except IndexError:
-        st.error("Data tidak ditemukan.")
-        st.stop()
+    balita_sel = df_page.loc[selected_idx]
+    # Index df_unique = index asli di GSheet
+    original_index = selected_idx
 
     with st.form("form_edit_balita"):
         c_e1, c_e2 = st.columns(2)
@@ -169,19 +177,26 @@ if not df_display.empty:
             ]
             
             # Panggil fungsi yang baru kita ganti di gsheet_utils
-            gsheet_utils.update_balita_by_index(int(original_index), data_upd_list)
+            # balita_sel = data yang sedang dilihat; ditolak bila baris di sheet sudah berubah
+            gsheet_utils.update_balita_by_index(int(original_index), data_upd_list, balita_sel)
             
             st.success(f"✅ Berhasil diupdate!")
             refresh_data()
             st.rerun()
+        except gsheet_utils.KonflikVersi as e:
+            st.error(f"⚠️ {e}")
+            refresh_data()
         except Exception as e:
             st.error(f"⚠️ Update Gagal: {str(e)}")
 
     if delete_clicked:
         try:
-            gsheet_utils.delete_balita_by_index(int(original_index))
+            gsheet_utils.delete_balita_by_index(int(original_index), balita_sel)
             st.warning("🗑️ Data dihapus!")
             refresh_data()
             st.rerun()
+        except gsheet_utils.KonflikVersi as e:
+            st.error(f"⚠️ {e}")
+            refresh_data()
         except Exception as e:
             st.error(f"⚠️ Gagal menghapus: {e}")
\ No newline at end of file
@@ -3,6 +3,9 @@ import pandas as pd
 from datetime import date
 import gsheet_utils 
 import time
+from query_utils import siapkan_pengukuran, query_pengukuran, jumlah_halaman
+from search_utils import IndeksNama
+from validasi_utils import validasi_pengukuran, screening
 from utils import (
     hitung_umur_bulan, load_lms, hitung_zscore, 
     hitung_z_bbtb, status_bbu, status_tbu, status_bbtb
@@ -19,14 +22,14 @@ def load_all_lms():
 lms_bbu, lms_tbu, lms_bbtb = load_all_lms()
 
 def force_refresh():
-    st.cache_data.clear()
-    if "df_pengukuran" in st.session_state: del st.session_state.df_pengukuran
-    if "df_balita" in st.session_state: del st.session_state.df_balita
+    # Store pengukuran sudah diperbarui langsung setelah tulis (tanpa reload sheet),
+    # cukup jalankan ulang halaman
     st.rerun()
 
 # Load Data Terbaru
 st.session_state.df_balita = gsheet_utils.load_balita()
 st.session_state.df_pengukuran = gsheet_utils.load_pengukuran()
+st.sidebar.caption(gsheet_utils.teks_umur_data([gsheet_utils.DESA_DEFAULT]))
 
 df_balita = st.session_state.df_balita
 df_pengukuran = st.session_state.df_pengukuran
@@ -34,11 +37,24 @@ df_pengukuran = st.session_state.df_pengukuran
 # ================== 1. FORM INPUT BARU & VALIDASI UMUR ==================
 st.subheader("➕ Input Pengukuran Baru")
 
-# 1. Gunakan .unique() agar nama balita tidak muncul berulang kali di dropdown
-daftar_balita_unik = df_balita["Nama Anak"].unique().tolist()
+# 1. Cari lewat indeks nama (awalan + toleran salah ketik), bukan daftar penuh
+@st.cache_resource(show_spinner=False)
+def indeks_balita():
+    return IndeksNama()
+
+indeks = indeks_balita()
+# Hanya balita yang belum ada di indeks yang ditambahkan
+indeks.sinkron(
+    (nama, nama, ibu, f"{nama} (Ibu: {ibu})")
+    for nama, ibu in zip(df_balita["Nama Anak"], df_balita["Nama Ibu"])
+)
+
+cari_balita = st.text_input("🔍 Cari Balita (nama anak / nama ibu)")
+kandidat = indeks.cari(cari_balita, limit=20)
 balita_nama = st.selectbox(
     "Pilih Balita", 
-    ["-- Pilih Balita --"] + sorted(daftar_balita_unik)
+    ["-- Pilih Balita --"] + kandidat,
+    format_func=lambda k: k if k == "-- Pilih Balita --" else indeks.label(k)
 )
 
 if balita_nama != "-- Pilih Balita --":
@@ -59,6 +75,7 @@ if balita_nama != "-- Pilih Balita --":
             c1, c2 = st.columns(2)
             in_bb = c1.number_input("Berat Badan (kg)", min_value=0.1, step=0.1)
             in_tb = c2.number_input("Tinggi Badan (cm)", min_value=1.0, step=0.1)
+            paksa_simpan = st.checkbox("Data sudah dicek ulang, tetap simpan meskipun tidak wajar")
             btn_simpan = st.form_submit_button("💾 Simpan Pengukuran")
 
             if btn_simpan:
@@ -78,7 +95,15 @@ if balita_nama != "-- Pilih Balita --":
                         round(z_tbu, 2), status_tbu(z_tbu),
                         round(z_bbtb, 2), status_bbtb(z_bbtb)
                     ]
-                    if gsheet_utils.insert_pengukuran(data_row):
+
+                    # Tolak nilai tidak wajar (batas WHO & lonjakan dari pengukuran sebelumnya)
+                    masalah = validasi_pengukuran(
+                        dict(zip(gsheet_utils.PENGUKURAN_COLS, data_row)),
+                        df_pengukuran[df_pengukuran["Nama Anak"] == balita_nama],
+                    )
+                    if masalah and not paksa_simpan:
+                        st.error("🚫 Nilai tidak wajar, periksa kembali BB/TB:\n\n- " + "\n- ".join(masalah))
+                    elif gsheet_utils.insert_pengukuran(data_row):
                         st.success("✅ Berhasil Disimpan!")
                         time.sleep(1)
                         force_refresh()
@@ -98,23 +123,63 @@ if balita_nama != "-- Pilih Balita --":
 # ================== 3. TABEL SELURUH PENGUKURAN ==================
 st.markdown("---")
 st.subheader("📚 Tabel Riwayat Seluruh Pengukuran")
+
+@st.cache_data(show_spinner=False)
+def siapkan_riwayat(df_pengukuran, df_balita):
+    df = siapkan_pengukuran(df_pengukuran, df_balita)
+    # Jaminan: kolom No numerik, No 0 = baris rusak/tanpa ID
+    df["No"] = pd.to_numeric(df["No"], errors='coerce').fillna(0).astype(int)
+    return df
+
+df_page = pd.DataFrame()
 if not df_pengukuran.empty:
-    st.dataframe(df_pengukuran, use_container_width=True, hide_index=True)
+    df_riwayat = siapkan_riwayat(df_pengukuran, df_balita)
+
+    with st.expander("🔍 Filter & Urutan", expanded=False):
+        q1, q2, q3 = st.columns(3)
+        q_nama = q1.text_input("Nama Anak (awalan)")
+        opsi_pos = sorted(df_riwayat["Posyandu"].unique().tolist()) if "Posyandu" in df_riwayat.columns else []
+        q_pos = q2.multiselect("Posyandu", opsi_pos)
+        opsi_status = sorted(df_riwayat["Status BB/TB"].dropna().unique().tolist())
+        q_status = q3.multiselect("Status BB/TB", opsi_status)
+
+        q4, q5, q6 = st.columns(3)
+        q_rentang = q4.date_input("Rentang Tanggal", value=(), format="DD/MM/YYYY")
+        q_sort = q5.selectbox("Urutkan", ["Tanggal Pengukuran", "No", "Nama Anak", "Umur", "Z-Score BB/TB"])
+        q_asc = q6.radio("Arah", ["Terbaru/Terbesar", "Terlama/Terkecil"], horizontal=True) == "Terlama/Terkecil"
+
+    tgl_dari = q_rentang[0] if len(q_rentang) >= 1 else None
+    tgl_sampai = q_rentang[1] if len(q_rentang) == 2 else None
+    page_size = 50
+
+    df_page, total = query_pengukuran(
+        df_riwayat, posyandu=q_pos, tanggal_dari=tgl_dari, tanggal_sampai=tgl_sampai,
+        status=q_status, prefix_nama=q_nama, sort_by=q_sort, ascending=q_asc,
+        page=st.session_state.get("hal_ukur", 1), page_size=page_size
+    )
+    n_halaman = jumlah_halaman(total, page_size)
+    if st.session_state.get("hal_ukur", 1) > n_halaman:
+        st.session_state.hal_ukur = n_halaman
+
+    # Hanya halaman aktif yang dikirim ke browser
+    st.dataframe(df_page, use_container_width=True, hide_index=True)
+    st.number_input(f"Halaman (dari {n_halaman})", min_value=1, max_value=n_halaman, step=1, key="hal_ukur")
+    st.caption(f"Menampilkan {len(df_page)} dari {total} pengukuran")
 
 # ================== 4. CRUD (EDIT & HAPUS) ==================
 st.divider()
 st.subheader("✏️ Koreksi / Edit Data")
 
 if not df_pengukuran.empty:
-    # Jaminan terakhir: Pastikan kolom No adalah angka sebelum difilter
-    df_pengukuran["No"] = pd.to_numeric(df_pengukuran["No"], errors='coerce').fillna(0)
-    
-    # Ambil data yang No-nya lebih dari 0
-    df_crud = df_pengukuran[df_pengukuran["No"] > 0].copy()
+    # Pilihan edit diambil dari halaman tabel yang sedang tampil (pakai filter di atas)
+    df_crud = df_page[df_page["No"] > 0].copy()
     
     if not df_crud.empty:
         list_no = df_crud["No"].astype(int).tolist()
-        sel_no = st.selectbox("Pilih No Data yang diperbaiki", list_no, key="select_crud")
+        sel_no = st.selectbox(
+            "Pilih No Data yang diperbaiki", list_no, key="select_crud",
+            format_func=lambda n: f"{n} - {df_crud.loc[df_crud['No'] == n, 'Nama Anak'].iloc[0]}"
+        )
 
         # Ambil baris data yang dipilih
         data_match = df_crud[df_crud["No"] == sel_no]
@@ -134,6 +199,7 @@ if not df_pengukuran.empty:
                 ce1, ce2 = st.columns(2)
                 upd_bb = ce1.number_input("Update BB (kg)", value=bb_cur, step=0.1)
                 upd_tb = ce2.number_input("Update TB (cm)", value=tb_cur, step=0.1)
+                paksa_upd = st.checkbox("Data sudah dicek ulang, tetap simpan meskipun tidak wajar")
                 
                 c_btn1, c_btn2 = st.columns(2)
                 btn_upd = c_btn1.form_submit_button("💾 Simpan Perubahan")
@@ -159,8 +225,13 @@ if not df_pengukuran.empty:
                             upd_bb, upd_tb, round(z1, 2), status_bbu(z1),
                             round(z2, 2), status_tbu(z2), round(z3, 2), status_bbtb(z3)
                         ]
-                        
-                        if gsheet_utils.update_pengukuran_by_id(no_id, upd_list):
+
+                        riwayat_lain = df_pengukuran[(df_pengukuran["Nama Anak"] == nama_edit) & (df_pengukuran["No"] != no_id)]
+                        masalah = validasi_pengukuran(dict(zip(gsheet_utils.PENGUKURAN_COLS, upd_list)), riwayat_lain)
+                        if masalah and not paksa_upd:
+                            st.error("🚫 Nilai tidak wajar, periksa kembali BB/TB:\n\n- " + "\n- ".join(masalah))
+                        # Versi yang dilihat pengguna: ditolak bila kader lain sudah mengubah baris ini
+                        elif gsheet_utils.update_pengukuran_by_id(no_id, upd_list, data_edit.get("Versi")):
                             st.success("✅ Berhasil Diperbarui!")
                             time.sleep(1)
                             force_refresh()
@@ -168,11 +239,38 @@ if not df_pengukuran.empty:
                         st.error(f"Gagal Update: {e}")
 
                 if btn_del:
-                    if gsheet_utils.delete_pengukuran_by_id(no_id):
-                        st.success(f"✅ Data No {no_id} Berhasil Dihapus!")
-                        time.sleep(1)
-                        force_refresh()
-                    else:
-                        st.error("❌ Gagal menghapus data.")
+                    try:
+                        if gsheet_utils.delete_pengukuran_by_id(no_id, data_edit.get("Versi")):
+                            st.success(f"✅ Data No {no_id} Berhasil Dihapus!")
+                            time.sleep(1)
+                            force_refresh()
+                        else:
+                            st.error("❌ Gagal menghapus data.")
+                    except gsheet_utils.KonflikVersi as e:
+                        st.error(f"⚠️ {e}")
+    else:
+        st.info("Tidak ada data pengukuran yang dapat diedit pada halaman ini.")
+# ================== 4. PEMERIKSAAN DATA TIDAK WAJAR ==================
+st.markdown("---")
+st.subheader("🧹 Pemeriksaan Data Tidak Wajar")
+
+@st.cache_data(show_spinner=False)
+def laporan_pembersihan(_df_pengukuran, revisi):
+    # Seluruh sheet diperiksa sekali per revisi data
+    return screening(_df_pengukuran)
+
+if not df_pengukuran.empty:
+    df_bersih = laporan_pembersihan(df_pengukuran, gsheet_utils.get_pengukuran_store().revisi)
+    if df_bersih.empty:
+        st.success("Tidak ada nilai tidak wajar pada riwayat pengukuran.")
     else:
-        st.info("Tidak ada data pengukuran yang dapat diedit.")
\ No newline at end of file
+        st.caption("Z-score di luar batas WHO (BB/U -6..+5, TB/U -6..+6, BB/TB -5..+5), "
+                   "TB menurun, atau BB berubah terlalu jauh dari pengukuran sebelumnya. "
+                   "Perbaiki lewat form Koreksi / Edit Data di atas.")
+        kolom_tampil = ["No", "Nama Anak", "Tanggal Pengukuran", "BB", "BB Sebelumnya",
+                        "TB", "TB Sebelumnya", "Z-Score BB/U", "Z-Score TB/U", "Z-Score BB/TB", "Masalah"]
+        st.dataframe(df_bersih[[k for k in kolom_tampil if k in df_bersih.columns]],
+                     use_container_width=True, hide_index=True, height=300)
+        st.write(f"Total: {len(df_bersih)} baris perlu dicek")
+        st.download_button("⬇️ Unduh Laporan (CSV)", df_bersih.to_csv(index=False).encode("utf-8"),
+                           file_name="laporan_data_tidak_wajar.csv", mime="text/csv")
@@ -6,7 +6,13 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import numpy as np # Ditambahkan untuk kebutuhan jitter
+from datetime import date
 import gsheet_utils 
+from search_utils import IndeksNama
+from analitik_utils import (siapkan_deret, hitung_velocity, MIN_TURUN_BERUNTUN,
+                            pita_persentil, AMBANG_TITIK_SEBARAN)
+from model_utils import prediksi_semua_anak
+from utils import load_semua_lms, kurva_sd, lms_wajar
 
 # =====================================================
 # KONFIGURASI & LOAD DATA
@@ -16,13 +22,20 @@ st.set_page_config(page_title="Monitoring Gizi Balita (WHO)", layout="wide")
 st.title("📊 Monitoring Perkembangan Balita")
 st.caption("Berdasarkan Standar Antropometri WHO")
 
-df_ukur = gsheet_utils.load_pengukuran()
+semua_desa = list(gsheet_utils.SPREADSHEET_SOURCES)
+desa_pilihan = st.sidebar.multiselect("🏘️ Filter Desa", semua_desa, default=semua_desa)
 
-if df_ukur.empty:
+# Cache per desa: desa yang tidak dipilih tidak ikut dimuat
+df_balita, df_ukur_mentah = gsheet_utils.load_multi_desa(desa_pilihan)
+st.sidebar.caption(gsheet_utils.teks_umur_data(desa_pilihan))
+
+if df_ukur_mentah.empty:
     st.warning("⚠️ Data pengukuran belum tersedia.")
     st.stop()
 
 # --- Preprocessing ---
+# Salinan untuk grafik; prediksi memakai data mentah (sama seperti saat pelatihan)
+df_ukur = df_ukur_mentah.copy()
 df_ukur["Tanggal Pengukuran"] = pd.to_datetime(df_ukur["Tanggal Pengukuran"], dayfirst=True, errors="coerce")
 df_ukur = df_ukur.dropna(subset=["Tanggal Pengukuran"])
 
@@ -38,7 +51,29 @@ for col in cols_z:
 # LOGIKA: AMBIL PENGUKURAN TERAKHIR DI SETIAP BULAN
 # =====================================================
 df_ukur['Bulan_Tahun_Key'] = df_ukur['Tanggal Pengukuran'].dt.to_period('M')
-df_filtered = df_ukur.sort_values("Tanggal Pengukuran").groupby(["Nama Anak", "Bulan_Tahun_Key"]).tail(1).copy()
+df_filtered = df_ukur.sort_values("Tanggal Pengukuran").groupby(["Desa", "Nama Anak", "Bulan_Tahun_Key"]).tail(1).copy()
+
+@st.cache_resource(show_spinner=False)
+def kurva_who():
+    # Kurva -3..+3 SD dihitung sekali dari tabel LMS, dipakai semua sesi & semua anak.
+    # Tabel yang S-nya tidak wajar (lihat utils.lms_wajar) -> None, garis SD tidak digambar
+    lms_bbu, lms_tbu, _ = load_semua_lms()
+    return {"BB": kurva_sd(lms_bbu) if lms_wajar(lms_bbu) else None,
+            "TB": kurva_sd(lms_tbu) if lms_wajar(lms_tbu) else None}
+
+def batas_y(nilai_anak, nilai_ref, jarak):
+    """Batas sumbu Y di sekitar data anak; garis SD ikut terlihat maksimal `jarak` satuan di luar data anak"""
+    lo, hi = np.nanmin(nilai_anak), np.nanmax(nilai_anak)
+    if nilai_ref is not None and np.isfinite(nilai_ref).any():
+        lo = max(min(lo, np.nanmin(nilai_ref)), lo - jarak)
+        hi = min(max(hi, np.nanmax(nilai_ref)), hi + jarak)
+    tepi = max((hi - lo) * 0.05, jarak * 0.1)
+    return lo - tepi, hi + tepi
+
+@st.cache_resource(show_spinner=False)
+def indeks_monitoring(desa_key):
+    # Satu indeks per kombinasi filter desa, dipakai bersama antar sesi
+    return IndeksNama()
 
 # =====================================================
 # MODE TAMPILAN
@@ -46,9 +81,24 @@ df_filtered = df_ukur.sort_values("Tanggal Pengukuran").groupby(["Nama Anak", "B
 mode = st.radio("Mode Tampilan", ["Individu", "Seluruh Data"])
 
 if mode == "Individu":
-    daftar_nama = sorted(df_filtered["Nama Anak"].unique().tolist())
-    nama_pilihan = st.selectbox("Pilih Balita", daftar_nama)
-    df_plot = df_filtered[df_filtered["Nama Anak"] == nama_pilihan].copy()
+    # Indeks nama dibangun sekali & diperbarui bertahap (hanya anak baru)
+    indeks = indeks_monitoring(tuple(sorted(desa_pilihan)))
+    anak_unik = df_ukur[["Nama Anak", "Desa"]].drop_duplicates()
+    indeks.sinkron(
+        ((nama, desa), nama, "", f"{nama} ({desa})")
+        for nama, desa in anak_unik.itertuples(index=False, name=None)
+    )
+
+    cari_anak = st.text_input("🔍 Cari Balita")
+    kandidat = indeks.cari(cari_anak, limit=20)
+    if not kandidat:
+        st.info("Balita tidak ditemukan. Coba ketik nama lain.")
+        st.stop()
+    nama_pilihan, desa_anak = st.selectbox(
+        "Pilih Balita", kandidat,
+        format_func=lambda a: a[0] if len(desa_pilihan) <= 1 else indeks.label(a)
+    )
+    df_plot = df_filtered[(df_filtered["Nama Anak"] == nama_pilihan) & (df_filtered["Desa"] == desa_anak)].copy()
     
     # --- RINGKASAN DETEKSI DINI (INDIVIDU) ---
     latest_data = df_plot.sort_values("Tanggal Pengukuran").iloc[-1]
@@ -84,6 +134,64 @@ if mode == "Individu":
     elif msg_color == "warning": st.warning(f"**{kesimpulan}**: {narasi}")
     else: st.error(f"**{kesimpulan}**: {narasi}")
 
+    # Gagal tumbuh: z-score turun beruntun walau status masih "Normal"
+    tren = hitung_velocity(siapkan_deret(df_plot)).iloc[-1]
+    if tren["Turun Beruntun"] >= MIN_TURUN_BERUNTUN:
+        st.warning(
+            f"📉 **Waspada Gagal Tumbuh**: Z-Score BB/U turun {int(tren['Turun Beruntun'])} kunjungan "
+            f"berturut-turut (Δ terakhir {tren['Delta Z BB/U']:+.2f}, BB {tren['Velocity BB']:+.2f} kg/bulan)."
+        )
+
+    # --- GRAFIK PERTUMBUHAN (KMS) ---
+    st.subheader("📏 Grafik Pertumbuhan terhadap Standar WHO")
+    data_anak = df_balita[(df_balita["Nama Anak"] == nama_pilihan) & (df_balita["Desa"] == desa_anak)] \
+        if {"Nama Anak", "Desa"} <= set(df_balita.columns) else df_balita.iloc[0:0]
+    jk_anak = str(data_anak["Jenis Kelamin"].iloc[0]).upper().strip() if not data_anak.empty else ""
+    kurva = kurva_who()
+
+    if jk_anak not in ("L", "P"):
+        st.info("Jenis kelamin balita belum tercatat, grafik pertumbuhan tidak dapat ditampilkan.")
+    else:
+        umur_anak = pd.to_numeric(df_plot["Umur"], errors="coerce")
+        gaya_sd = {-3: ("#c0392b", "--"), -2: ("#e67e22", "--"), -1: ("#95a5a6", ":"), 0: ("#27ae60", "-"),
+                   1: ("#95a5a6", ":"), 2: ("#e67e22", "--"), 3: ("#c0392b", "--")}
+        kolom_kms = st.columns(2)
+        for kol, (ukuran, judul, satuan, jarak) in zip(kolom_kms, [("BB", "Berat Badan menurut Umur", "kg", 4),
+                                                                   ("TB", "Tinggi Badan menurut Umur", "cm", 15)]):
+            nilai_anak = pd.to_numeric(df_plot[ukuran], errors="coerce")
+            fig_kms, ax_kms = plt.subplots(figsize=(7, 5))
+            nilai_ref_anak = None
+            if kurva[ukuran] is not None and jk_anak in kurva[ukuran]:
+                umur_ref, nilai_ref = kurva[ukuran][jk_anak]
+                ax_kms.fill_between(umur_ref, nilai_ref[:, 1], nilai_ref[:, 5], color="#2ecc71", alpha=0.12)
+                for i, sd in enumerate(range(-3, 4)):
+                    warna, garis = gaya_sd[sd]
+                    ax_kms.plot(umur_ref, nilai_ref[:, i], color=warna, linestyle=garis, linewidth=1)
+                    ax_kms.annotate(f"{sd:+d} SD" if sd else "Median", (umur_ref[-1], nilai_ref[-1, i]),
+                                    xytext=(3, 0), textcoords="offset points", fontsize=7, color=warna, va="center",
+                                    annotation_clip=True)
+                # Garis SD pada rentang umur anak saja yang ikut menentukan sumbu Y
+                di_umur = (umur_ref >= umur_anak.min()) & (umur_ref <= umur_anak.max())
+                nilai_ref_anak = nilai_ref[di_umur]
+                batas_x = umur_ref[-1] + 6
+            else:
+                kol.caption(f"Tabel LMS {ukuran}/U tidak valid (S bukan koefisien variasi), "
+                            f"garis standar WHO tidak ditampilkan.")
+                batas_x = max(60, umur_anak.max()) + 6
+            ax_kms.plot(umur_anak, nilai_anak,
+                        marker="o", color="#1f77b4", linewidth=2, markersize=6, label=nama_pilihan, zorder=5)
+            ax_kms.set_xlim(0, batas_x)
+            if nilai_anak.notna().any():
+                ax_kms.set_ylim(*batas_y(nilai_anak, nilai_ref_anak, jarak))
+            ax_kms.set_xlabel("Umur (bulan)")
+            ax_kms.set_ylabel(f"{ukuran} ({satuan})")
+            ax_kms.set_title(judul)
+            ax_kms.grid(True, linestyle=":", alpha=0.4)
+            ax_kms.legend(loc="upper left", fontsize="small")
+            plt.tight_layout()
+            kol.pyplot(fig_kms)
+            plt.close(fig_kms)
+
 else:
     df_plot = df_filtered.copy()
     nama_pilihan = "Semua Balita"
@@ -91,6 +199,12 @@ else:
 # --- GRAFIK TREN Z-SCORE ---
 st.subheader(f"📈 Grafik Tren Z-Score: {nama_pilihan}")
 
+# Populasi besar: titik per anak-bulan diganti pita persentil per bulan
+pakai_pita = mode == "Seluruh Data" and len(df_plot) > AMBANG_TITIK_SEBARAN
+if pakai_pita:
+    st.caption(f"{len(df_plot):,} pengukuran: ditampilkan sebagai pita persentil per bulan "
+               f"(P3–P97, P15–P85, median) agar tetap terbaca.")
+
 metrics = [
     ("Z-Score BB/U", "Berat Badan menurut Umur (BB/U)"),
     ("Z-Score TB/U", "Tinggi Badan menurut Umur (TB/U)"),
@@ -119,6 +233,20 @@ for col_name, label_text in metrics:
         # 4. Rotasi label agar tidak bertumpuk
         plt.xticks(rotation=45, ha="right")
     
+    elif pakai_pita:
+        # MODE SELURUH DATA (BESAR): hanya agregat per bulan yang digambar
+        pita = pita_persentil(df_plot["Tanggal Pengukuran"], df_plot[col_name])
+        ax.fill_between(pita.index, pita["P3"], pita["P97"], color="#1f77b4", alpha=0.15,
+                        step="mid", label="P3 – P97", zorder=2)
+        ax.fill_between(pita.index, pita["P15"], pita["P85"], color="#1f77b4", alpha=0.3,
+                        step="mid", label="P15 – P85", zorder=3)
+        ax.plot(pita.index, pita["P50"], color="#1f77b4", linewidth=2, label="Median Populasi", zorder=4)
+        ax.plot(pita.index, pita["Rata-rata"], color="red", linewidth=1.5, linestyle=":",
+                label="Rata-rata Populasi", zorder=5)
+
+        ax.xaxis.set_major_locator(mdates.YearLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y"))
+
     else:
         # MODE SELURUH DATA: Perbaikan ukuran titik dan sebaran
         # Jitter diperlebar sedikit ke 0.2 agar sebaran lebih jelas
@@ -142,8 +270,10 @@ for col_name, label_text in metrics:
     ax.axhline(-2, color="red", linestyle="--", alpha=0.6, label="-2 SD (Zona Merah)", zorder=1)
     ax.axhline(2, color="red", linestyle="--", alpha=0.6, label="+2 SD (Zona Merah)", zorder=1)
     
-    # Batas Y dinamis agar tidak terpotong
-    if not df_plot[col_name].empty:
+    # Batas Y dinamis agar tidak terpotong (pita: cukup sampai P3/P97)
+    if pakai_pita and not pita.empty:
+        ax.set_ylim(min(pita["P3"].min(), -2) - 1.5, max(pita["P97"].max(), 2) + 1.5)
+    elif not df_plot[col_name].empty:
         ax.set_ylim(df_plot[col_name].min() - 1.5, df_plot[col_name].max() + 1.5)
 
     ax.set_ylabel(f"Nilai {col_name}") 
@@ -159,7 +289,7 @@ for col_name, label_text in metrics:
 st.divider()
 st.subheader("📋 Analisis Status Gizi Terakhir (BB/TB)")
 
-df_latest_status = df_plot.sort_values("Tanggal Pengukuran").groupby("Nama Anak").tail(1).copy()
+df_latest_status = df_plot.sort_values("Tanggal Pengukuran").groupby(["Desa", "Nama Anak"]).tail(1).copy()
 
 col_chart, col_table = st.columns([1.3, 1])
 
@@ -209,6 +339,21 @@ with col_table:
         display_cols = ["Nama Anak", "Tanggal", "Status BB/U", "Status TB/U", "Status BB/TB"]
         st.dataframe(df_table[display_cols], use_container_width=True, hide_index=True)
 
+# =====================================================
+# PREDIKSI FREKUENSI KUNJUNGAN (SEMUA ANAK SEKALIGUS)
+# =====================================================
+st.divider()
+st.subheader("🔮 Prediksi Frekuensi Kunjungan")
+try:
+    # Satu panggilan predict untuk seluruh anak, di-cache per revisi data
+    df_prediksi = prediksi_semua_anak(df_ukur_mentah, df_balita, gsheet_utils.revisi_data(desa_pilihan), date.today())
+    if mode == "Individu":
+        df_prediksi = df_prediksi[(df_prediksi["Nama Anak"] == nama_pilihan) & (df_prediksi["Desa"] == desa_anak)]
+    kolom_pred = [k for k in ["Nama Anak", "Desa", "jumlah_kunjungan", "Prediksi Frekuensi"] if k in df_prediksi.columns]
+    st.dataframe(df_prediksi[kolom_pred], use_container_width=True, hide_index=True, height=300)
+except ValueError as e:
+    st.info(f"Prediksi belum bisa ditampilkan: {e}")
+
 # =====================================================
 # EDUKASI
 # =====================================================
@@ -0,0 +1,79 @@
+# =====================================================
+# IMPORT
+# =====================================================
+import streamlit as st
+import gsheet_utils
+from query_utils import siapkan_balita
+from utils import parse_tanggal
+from laporan_utils import buat_laporan, NAMA_BULAN
+
+# =====================================================
+# KONFIGURASI & LOAD DATA
+# =====================================================
+st.set_page_config(page_title="Laporan Bulanan Posyandu", layout="wide")
+
+st.title("🗂️ Laporan Bulanan Posyandu")
+st.caption("Rekap anak yang diukur beserta status BB/U, TB/U, dan BB/TB per posyandu dan bulan")
+
+semua_desa = list(gsheet_utils.SPREADSHEET_SOURCES)
+desa_pilihan = st.sidebar.multiselect("🏘️ Filter Desa", semua_desa, default=semua_desa)
+
+df_balita, df_ukur = gsheet_utils.load_multi_desa(desa_pilihan)
+st.sidebar.caption(gsheet_utils.teks_umur_data(desa_pilihan))
+
+if df_ukur.empty:
+    st.warning("⚠️ Data pengukuran belum tersedia.")
+    st.stop()
+
+@st.cache_data(show_spinner=False)
+def daftar_tahun(_df_ukur, revisi):
+    tanggal = parse_tanggal(_df_ukur["Tanggal Pengukuran"]).dropna()
+    return sorted(tanggal.dt.year.unique().tolist(), reverse=True)
+
+@st.cache_data(show_spinner=False)
+def siapkan_laporan_cache(_df_ukur, _df_balita, revisi, tahun, bulan, posyandu):
+    # DataFrame tidak di-hash; kunci cache = revisi data + pilihan laporan
+    return buat_laporan(_df_ukur, _df_balita, tahun, bulan, list(posyandu) or None)
+
+# =====================================================
+# PILIHAN LAPORAN
+# =====================================================
+revisi = gsheet_utils.revisi_data(desa_pilihan)
+semua_tahun = daftar_tahun(df_ukur, revisi)
+semua_posyandu = sorted(siapkan_balita(df_balita)["Posyandu"].dropna().unique()) if not df_balita.empty else []
+
+c1, c2, c3 = st.columns(3)
+with c1:
+    tahun = st.selectbox("Tahun", semua_tahun)
+with c2:
+    bulan = st.selectbox("Bulan", [None] + list(range(1, 13)),
+                         format_func=lambda b: "Semua Bulan" if b is None else NAMA_BULAN[b - 1])
+with c3:
+    posyandu = st.multiselect("Posyandu", semua_posyandu, placeholder="Semua Posyandu")
+
+if st.button("📄 Buat Laporan", type="primary"):
+    with st.spinner("Menyusun laporan..."):
+        st.session_state["laporan"] = {
+            "file": siapkan_laporan_cache(df_ukur, df_balita, revisi, tahun, bulan, tuple(posyandu)),
+            "nama": f"laporan_posyandu_{tahun}" + (f"_{bulan:02d}" if bulan else ""),
+        }
+
+# =====================================================
+# UNDUH
+# =====================================================
+laporan = st.session_state.get("laporan")
+if laporan and not laporan["file"]:
+    st.info("Tidak ada pengukuran pada tahun, bulan, dan posyandu yang dipilih.")
+elif laporan:
+    st.success("Laporan siap diunduh.")
+    d1, d2 = st.columns(2)
+    with d1:
+        st.download_button(
+            "⬇️ Unduh Excel (.xlsx)", laporan["file"]["xlsx"], file_name=f"{laporan['nama']}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+    with d2:
+        st.download_button(
+            "⬇️ Unduh PDF", laporan["file"]["pdf"], file_name=f"{laporan['nama']}.pdf",
+            mime="application/pdf",
+        )
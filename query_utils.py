@@ -0,0 +1,131 @@
+# ============================== query_utils.py ==============================
+
+import numpy as np
+import pandas as pd
+from utils import map_posyandu_series, parse_tanggal
+
+# ======================================================
+# QUERY DATA TER-CACHE (FILTER, SORT, PAGINASI)
+# ======================================================
+# Semua fungsi di sini bekerja di atas DataFrame yang sudah ada di memori.
+# Halaman Streamlit cukup mengirim satu halaman hasil ke browser,
+# bukan seluruh tabel.
+
+PAGE_SIZE_DEFAULT = 50
+
+def jumlah_halaman(total, page_size=PAGE_SIZE_DEFAULT):
+    return max(1, int(np.ceil(total / max(int(page_size), 1))))
+
+def _potong_halaman(df, page, page_size):
+    page_size = max(int(page_size), 1)
+    page = min(max(int(page), 1), jumlah_halaman(len(df), page_size))
+    awal = (page - 1) * page_size
+    return df.iloc[awal:awal + page_size]
+
+def _sebagai_list(nilai):
+    if isinstance(nilai, (list, tuple, set, np.ndarray, pd.Series)):
+        return list(nilai)
+    return [nilai]
+
+def _mask_prefix(series, prefix_nama):
+    prefix = str(prefix_nama).upper().strip()
+    return series.astype(str).str.upper().str.startswith(prefix)
+
+
+# ======================================================
+# PERSIAPAN DATA (SEKALI PER DATA BARU)
+# ======================================================
+def siapkan_balita(df_balita):
+    """Kolom Posyandu hasil mapping RT/RW (vektor); desa tanpa aturan memakai isian sheet"""
+    df = df_balita.copy()
+    if df.empty:
+        df["Posyandu"] = pd.Series(dtype=str)
+        return df
+    desa = df["Desa"] if "Desa" in df.columns else None
+    isian = df["Posyandu"] if "Posyandu" in df.columns else None
+    df["Posyandu"] = map_posyandu_series(df["RT"], df["RW"], desa, isian).fillna("Tidak Terdaftar")
+    return df
+
+def siapkan_pengukuran(df_pengukuran, df_balita=None):
+    """
+    Parse tanggal sekali & tempelkan Posyandu dari data balita,
+    supaya query berikutnya hanya berupa mask & slicing.
+    """
+    df = df_pengukuran.copy()
+    df["_tanggal"] = parse_tanggal(df["Tanggal Pengukuran"])
+
+    if df_balita is not None and not df_balita.empty and "Posyandu" not in df.columns:
+        kunci = ["Nama Anak"] + (["Desa"] if "Desa" in df.columns and "Desa" in df_balita.columns else [])
+        ref = siapkan_balita(df_balita).drop_duplicates(subset=kunci)[kunci + ["Posyandu"]]
+        df = df.merge(ref, on=kunci, how="left")
+
+    if "Posyandu" in df.columns:
+        df["Posyandu"] = df["Posyandu"].fillna("Tidak Terdaftar")
+    return df
+
+
+# ======================================================
+# QUERY PENGUKURAN
+# ======================================================
+def query_pengukuran(df, posyandu=None, tanggal_dari=None, tanggal_sampai=None,
+                     status=None, kolom_status="Status BB/TB", prefix_nama=None,
+                     sort_by="Tanggal Pengukuran", ascending=False,
+                     page=1, page_size=PAGE_SIZE_DEFAULT):
+    """
+    Filter + sort + paginasi riwayat pengukuran.
+    df sebaiknya hasil siapkan_pengukuran().
+    Return (df_halaman, total_baris_setelah_filter)
+    """
+    if df.empty:
+        return df, 0
+
+    mask = np.ones(len(df), dtype=bool)
+
+    if posyandu and "Posyandu" in df.columns:
+        mask &= df["Posyandu"].isin(_sebagai_list(posyandu)).to_numpy()
+    if "_tanggal" in df.columns:
+        if tanggal_dari is not None:
+            mask &= (df["_tanggal"] >= pd.Timestamp(tanggal_dari)).to_numpy()
+        if tanggal_sampai is not None:
+            mask &= (df["_tanggal"] <= pd.Timestamp(tanggal_sampai)).to_numpy()
+    if status and kolom_status in df.columns:
+        mask &= df[kolom_status].isin(_sebagai_list(status)).to_numpy()
+    if prefix_nama:
+        mask &= _mask_prefix(df["Nama Anak"], prefix_nama).to_numpy()
+
+    hasil = df[mask]
+
+    # Urutkan tanggal memakai kolom datetime yang sudah di-parse
+    kolom_sort = "_tanggal" if sort_by == "Tanggal Pengukuran" and "_tanggal" in hasil.columns else sort_by
+    if kolom_sort in hasil.columns:
+        hasil = hasil.sort_values(kolom_sort, ascending=ascending, kind="stable")
+
+    halaman = _potong_halaman(hasil, page, page_size)
+    return halaman.drop(columns=["_tanggal"], errors="ignore"), len(hasil)
+
+
+# ======================================================
+# QUERY BALITA
+# ======================================================
+def query_balita(df, posyandu=None, prefix_nama=None, sort_by="Nama Anak",
+                 ascending=True, page=1, page_size=PAGE_SIZE_DEFAULT):
+    """
+    Filter + sort + paginasi data balita (hasil siapkan_balita()).
+    prefix_nama dicocokkan ke Nama Anak maupun Nama Ibu.
+    Return (df_halaman, total_baris_setelah_filter)
+    """
+    if df.empty:
+        return df, 0
+
+    mask = np.ones(len(df), dtype=bool)
+    if posyandu:
+        mask &= df["Posyandu"].isin(_sebagai_list(posyandu)).to_numpy()
+    if prefix_nama:
+        mask &= (_mask_prefix(df["Nama Anak"], prefix_nama) |
+                 _mask_prefix(df["Nama Ibu"], prefix_nama)).to_numpy()
+
+    hasil = df[mask]
+    if sort_by in hasil.columns:
+        hasil = hasil.sort_values(sort_by, ascending=ascending, kind="stable")
+
+    return _potong_halaman(hasil, page, page_size), len(hasil)
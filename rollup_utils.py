@@ -0,0 +1,201 @@
+# ============================== rollup_utils.py ==============================
+
+import threading
+from collections import Counter, defaultdict
+
+import pandas as pd
+from utils import parse_tanggal
+
+# ======================================================
+# ROLLUP METRIK DASHBOARD (POSYANDU x BULAN x INDIKATOR)
+# ======================================================
+# Dibangun sekali setiap sinkron sheet, lalu diperbarui per insert/update/hapus.
+# Tile & grafik dashboard cukup membaca sel rollup, tidak memindai riwayat.
+
+INDIKATOR = {"BB/U": "Status BB/U", "TB/U": "Status TB/U", "BB/TB": "Status BB/TB"}
+TIDAK_TERDAFTAR = "Tidak Terdaftar"
+
+
+class RollupCube:
+    """
+    Sel:
+    - kunjungan[(posyandu, periode)]                  -> Counter{anak: jumlah kunjungan}
+    - status[(posyandu, periode, indikator, status)]  -> Counter{anak: jumlah kunjungan}
+    - terakhir[(posyandu, indikator, status)]         -> jumlah anak (status pengukuran terakhir)
+    periode = "YYYY-MM"
+    """
+
+    def __init__(self, peta_posyandu=None):
+        self._lock = threading.RLock()
+        self.peta_posyandu = dict(peta_posyandu or {})   # Nama Anak -> Posyandu
+        self._kosongkan()
+
+    def _kosongkan(self):
+        self._rekam = {}                          # No -> (anak, tanggal ns, periode, {indikator: status})
+        self._per_anak = defaultdict(set)         # anak -> {No}
+        self._terakhir_anak = {}                  # anak -> (No terakhir, posyandu, {indikator: status})
+        self.kunjungan = defaultdict(Counter)
+        self.status = defaultdict(Counter)
+        self.terakhir = Counter()
+
+    # ---------------- PEMBANGUNAN & PEMBARUAN ----------------
+    def sinkron(self, df_pengukuran):
+        """Bangun ulang seluruh sel dari snapshot (dipanggil setiap sheet dimuat ulang)"""
+        df = df_pengukuran.assign(_tgl=parse_tanggal(df_pengukuran["Tanggal Pengukuran"]))
+        df = df.dropna(subset=["_tgl"])
+        # Periode di-format sekali per bulan unik, bukan per baris
+        kode_bulan = df["_tgl"].dt.year * 100 + df["_tgl"].dt.month
+        periode = kode_bulan.map({k: f"{k // 100}-{k % 100:02d}" for k in kode_bulan.unique()})
+        kolom = [df[k].tolist() for k in INDIKATOR.values()]
+        rekam = {
+            no: (anak, tgl, per, dict(zip(INDIKATOR, status)))
+            for no, anak, tgl, per, *status in zip(
+                df["No"].astype(int).tolist(), df["Nama Anak"].tolist(),
+                df["_tgl"].astype("int64").tolist(), periode.tolist(), *kolom)
+        }
+        with self._lock:
+            self._bangun_ulang(rekam)
+
+    def tambah(self, no, baris):
+        """baris: dict/Series berisi Nama Anak, Tanggal Pengukuran, Status BB/U, TB/U, BB/TB"""
+        no = int(no)
+        tgl = pd.to_datetime(baris["Tanggal Pengukuran"], dayfirst=True, errors="coerce")
+        if pd.isna(tgl):
+            return
+        anak = baris["Nama Anak"]
+        with self._lock:
+            if no in self._rekam:
+                self._hapus(no)
+            status = {ind: baris[kol] for ind, kol in INDIKATOR.items()}
+            self._rekam[no] = (anak, tgl.value, tgl.strftime("%Y-%m"), status)
+            self._per_anak[anak].add(no)
+            self._tambah_sel(no, +1)
+            self._set_terakhir(anak)
+
+    def ubah(self, no, baris):
+        self.tambah(no, baris)
+
+    def hapus(self, no):
+        with self._lock:
+            self._hapus(int(no))
+
+    def _hapus(self, no):
+        if no not in self._rekam:
+            return
+        anak = self._rekam[no][0]
+        self._tambah_sel(no, -1)
+        del self._rekam[no]
+        self._per_anak[anak].discard(no)
+        self._set_terakhir(anak)
+
+    def atur_peta_posyandu(self, peta_posyandu):
+        """Peta anak -> posyandu berubah (balita baru / pindah RT-RW): hitung ulang dari rekaman"""
+        peta_posyandu = dict(peta_posyandu)
+        with self._lock:
+            if peta_posyandu == self.peta_posyandu:
+                return
+            self.peta_posyandu = peta_posyandu
+            self._bangun_ulang(self._rekam)
+
+    def _bangun_ulang(self, rekam):
+        """Isi semua sel dari rekaman lewat groupby (tanpa update per baris)"""
+        self._kosongkan()
+        self._rekam = dict(rekam)
+        if not rekam:
+            return
+
+        df = pd.DataFrame(list(rekam.values()), columns=["anak", "tgl", "periode", "status"])
+        df["no"] = list(rekam)
+        for ind in INDIKATOR:
+            df[ind] = [st[ind] for st in df["status"]]
+        df["pos"] = df["anak"].map(self.peta_posyandu).fillna(TIDAK_TERDAFTAR)
+
+        for (pos, periode, anak), n in df.groupby(["pos", "periode", "anak"]).size().items():
+            self.kunjungan[(pos, periode)][anak] = n
+        for ind in INDIKATOR:
+            hitung = df.groupby(["pos", "periode", ind, "anak"], dropna=False).size()
+            for (pos, periode, st, anak), n in hitung.items():
+                self.status[(pos, periode, ind, st)][anak] = n
+
+        for anak, no in zip(df["anak"], df["no"]):
+            self._per_anak[anak].add(no)
+        terakhir = df.sort_values(["tgl", "no"]).groupby("anak").tail(1)
+        for anak, no, pos, status in zip(terakhir["anak"], terakhir["no"], terakhir["pos"], terakhir["status"]):
+            self._terakhir_anak[anak] = (no, pos, status)
+            for ind, st in status.items():
+                self.terakhir[(pos, ind, st)] += 1
+
+    # ---------------- INTERNAL ----------------
+    def _posyandu(self, anak):
+        return self.peta_posyandu.get(anak) or TIDAK_TERDAFTAR
+
+    def _tambah_sel(self, no, arah):
+        anak, _, periode, status = self._rekam[no]
+        pos = self._posyandu(anak)
+        sel = [self.kunjungan[(pos, periode)]]
+        sel += [self.status[(pos, periode, ind, st)] for ind, st in status.items()]
+        for counter in sel:
+            counter[anak] += arah
+            if counter[anak] <= 0:
+                del counter[anak]
+
+    def _set_terakhir(self, anak):
+        """Perbarui status terakhir satu anak (hanya riwayat anak itu yang dilihat)"""
+        lama = self._terakhir_anak.pop(anak, None)
+        if lama is not None:
+            _, pos, status = lama
+            for ind, st in status.items():
+                self.terakhir[(pos, ind, st)] -= 1
+                if self.terakhir[(pos, ind, st)] <= 0:
+                    del self.terakhir[(pos, ind, st)]
+
+        nomor = self._per_anak.get(anak)
+        if not nomor:
+            self._per_anak.pop(anak, None)
+            return
+        no_terakhir = max(nomor, key=lambda n: (self._rekam[n][1], n))
+        pos, status = self._posyandu(anak), self._rekam[no_terakhir][3]
+        self._terakhir_anak[anak] = (no_terakhir, pos, status)
+        for ind, st in status.items():
+            self.terakhir[(pos, ind, st)] += 1
+
+    # ---------------- BACA (O(jumlah sel)) ----------------
+    def daftar_posyandu(self):
+        with self._lock:
+            return sorted({pos for pos, _ in self.kunjungan})
+
+    def kunjungan_per_bulan(self, posyandu=None):
+        """DataFrame: Periode, Kunjungan, Anak (anak unik per bulan)"""
+        with self._lock:
+            per_periode = defaultdict(Counter)
+            for (pos, periode), counter in self.kunjungan.items():
+                if posyandu in (None, pos) and counter:
+                    per_periode[periode].update(counter)
+            baris = [(p, sum(c.values()), len(c)) for p, c in per_periode.items()]
+        return pd.DataFrame(baris, columns=["Periode", "Kunjungan", "Anak"]).sort_values("Periode", ignore_index=True)
+
+    def status_per_bulan(self, indikator="BB/TB", posyandu=None):
+        """Pivot Periode x Status berisi jumlah anak"""
+        with self._lock:
+            per_sel = defaultdict(set)
+            for (pos, periode, ind, st), counter in self.status.items():
+                if ind == indikator and posyandu in (None, pos) and counter:
+                    per_sel[(periode, st)].update(counter)
+            baris = [(periode, st, len(anak)) for (periode, st), anak in per_sel.items()]
+        df = pd.DataFrame(baris, columns=["Periode", "Status", "Anak"])
+        return df.pivot_table(index="Periode", columns="Status", values="Anak", fill_value=0)
+
+    def status_terakhir(self, indikator="BB/TB", posyandu=None):
+        """Series Status -> jumlah anak berdasarkan pengukuran terakhir tiap anak"""
+        with self._lock:
+            hasil = Counter()
+            for (pos, ind, st), n in self.terakhir.items():
+                if ind == indikator and posyandu in (None, pos):
+                    hasil[st] += n
+        return pd.Series(hasil, dtype=int).sort_values(ascending=False)
+
+    def jumlah_anak(self, posyandu=None):
+        with self._lock:
+            if posyandu is None:
+                return len(self._terakhir_anak)
+            return sum(1 for _, pos, _ in self._terakhir_anak.values() if pos == posyandu)
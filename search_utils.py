@@ -0,0 +1,156 @@
+# ============================== search_utils.py ==============================
+
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+# ======================================================
+# INDEKS PENCARIAN NAMA ANAK & NAMA IBU
+# ======================================================
+# - Array terurut (bisect) untuk pencarian awalan nama / awalan kata
+# - Indeks trigram + rasio kemiripan untuk nama yang salah ketik
+# Indeks diperbarui bertahap: hanya balita baru yang ditambahkan.
+
+def normalisasi_nama(nama):
+    nama = re.sub(r"[^A-Z0-9 ]", " ", str(nama).upper())
+    return re.sub(r"\s+", " ", nama).strip()
+
+def _trigram(teks):
+    teks = f"  {teks} "
+    return {teks[i:i + 3] for i in range(len(teks) - 2)}
+
+
+class IndeksNama:
+    """
+    Indeks nama untuk memilih balita.
+    key  : identitas balita (mis. Nama Anak, atau tuple (Nama Anak, Desa))
+    label: teks yang ditampilkan di selectbox
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entri = {}                   # key -> (label, [teks ternormalisasi])
+        self._urut = []                    # [(token/nama, repr key)] terurut untuk awalan
+        self._repr = {}                    # repr key -> key (key tuple tidak selalu bisa dibandingkan)
+        self._trigram = defaultdict(set)   # trigram -> {key}
+
+    def __len__(self):
+        return len(self._entri)
+
+    # ---------------- PEMBARUAN ----------------
+    def tambah(self, key, nama_anak, nama_ibu="", label=None):
+        with self._lock:
+            self._tambah(key, nama_anak, nama_ibu, label)
+
+    def _tambah(self, key, nama_anak, nama_ibu, label, insort_langsung=True):
+        if key in self._entri:
+            self._hapus(key)
+
+        teks = [t for t in (normalisasi_nama(nama_anak), normalisasi_nama(nama_ibu)) if t]
+        self._entri[key] = (label or str(nama_anak), teks)
+
+        # Nama lengkap + tiap kata, supaya "SARI" menemukan "DEWI SARI"
+        token = set(teks)
+        for t in teks:
+            token.update(t.split())
+        self._repr[repr(key)] = key
+        for tk in token:
+            if insort_langsung:
+                insort(self._urut, (tk, repr(key)))
+            else:
+                self._urut.append((tk, repr(key)))
+        for t in teks:
+            for tri in _trigram(t):
+                self._trigram[tri].add(key)
+
+    def hapus(self, key):
+        with self._lock:
+            self._hapus(key)
+
+    def _hapus(self, key):
+        entri = self._entri.pop(key, None)
+        if entri is None:
+            return
+        self._repr.pop(repr(key), None)
+        self._urut = [u for u in self._urut if u[1] != repr(key)]
+        for t in entri[1]:
+            for tri in _trigram(t):
+                self._trigram[tri].discard(key)
+
+    def sinkron(self, daftar):
+        """
+        Samakan indeks dengan data terbaru.
+        daftar: iterable (key, nama_anak, nama_ibu, label)
+        Hanya entri baru/hilang yang diproses, sisanya tidak disentuh.
+        """
+        daftar = {d[0]: d for d in daftar}
+        with self._lock:
+            for key in set(self._entri) - set(daftar):
+                self._hapus(key)
+            baru = set(daftar) - set(self._entri)
+            # Banyak entri baru (build awal): tambah semua lalu urutkan sekali
+            massal = len(baru) > 50
+            for key in baru:
+                _, nama_anak, nama_ibu, label = daftar[key]
+                self._tambah(key, nama_anak, nama_ibu, label, insort_langsung=not massal)
+            if massal:
+                self._urut.sort()
+
+    # ---------------- PENCARIAN ----------------
+    def label(self, key):
+        entri = self._entri.get(key)
+        return entri[0] if entri else str(key)
+
+    def cari_awalan(self, query, limit=20):
+        """Nama/kata yang diawali query, urut abjad. Query kosong = entri abjad pertama."""
+        q = normalisasi_nama(query)
+        hasil = []
+        with self._lock:
+            i = bisect_left(self._urut, (q, ""))
+            while i < len(self._urut) and self._urut[i][0].startswith(q):
+                key = self._repr[self._urut[i][1]]
+                if key not in hasil:
+                    hasil.append(key)
+                    if len(hasil) >= limit:
+                        break
+                i += 1
+        return hasil
+
+    def cari_mirip(self, query, limit=20, min_skor=0.6):
+        """Cari nama yang mirip (toleran salah ketik) lewat trigram + rasio kemiripan"""
+        q = normalisasi_nama(query)
+        if not q:
+            return []
+        with self._lock:
+            hitung = Counter()
+            for tri in _trigram(q):
+                hitung.update(self._trigram.get(tri, ()))
+
+            # Hanya kandidat dengan trigram bersama terbanyak yang dinilai detail
+            skor = []
+            for key, _ in hitung.most_common(limit * 5):
+                teks = self._entri[key][1]
+                terbaik = max(_kemiripan(q, t) for t in teks)
+                if terbaik >= min_skor:
+                    skor.append((terbaik, key))
+        skor.sort(key=lambda s: -s[0])
+        return [key for _, key in skor[:limit]]
+
+    def cari(self, query, limit=20):
+        """Awalan dulu, lalu dilengkapi hasil fuzzy. Return list key."""
+        hasil = self.cari_awalan(query, limit)
+        if normalisasi_nama(query) and len(hasil) < limit:
+            for key in self.cari_mirip(query, limit):
+                if key not in hasil:
+                    hasil.append(key)
+                if len(hasil) >= limit:
+                    break
+        return hasil
+
+
+def _kemiripan(q, teks):
+    # Bandingkan juga dengan awalan sepanjang query (nama yang baru diketik sebagian)
+    awal = teks[:len(q)]
+    return max(SequenceMatcher(None, q, teks).ratio(), SequenceMatcher(None, q, awal).ratio())
@@ -0,0 +1,518 @@
+# ============================== sheet_store.py ==============================
+
+import re
+import threading
+import time
+
+import pandas as pd
+
+# ======================================================
+# STORE PENGUKURAN BERBASIS ID (BUKAN NOMOR BARIS)
+# ======================================================
+# - Kolom "No" adalah ID permanen, tidak pernah dipakai ulang
+# - Peta No -> nomor baris sheet disimpan di memori
+# - Hapus = tandai kolom "Dihapus" (tombstone), baris fisik tidak digeser,
+#   sehingga peta No -> baris tetap valid setelah penghapusan
+# - Setiap perubahan = satu penulisan range, snapshot di memori ikut diperbarui
+# - Kolom "Versi" naik setiap update/hapus; update & hapus bersifat
+#   compare-and-swap: ditolak (KonflikVersi) bila versi yang dilihat
+#   pengguna sudah bukan versi terakhir
+# - ID baru dialokasikan oleh store (satu per proses, dipakai semua sesi),
+#   bukan dihitung tiap sesi dari isi sheet
+
+KOLOM_DIHAPUS = "Dihapus"
+KOLOM_VERSI = "Versi"
+KOLOM_NUMERIK = ["No", "Umur", "BB", "TB", "Z-Score BB/U", "Z-Score TB/U", "Z-Score BB/TB"]
+
+
+def huruf_kolom(n):
+    """1 -> A, 12 -> L, 27 -> AA"""
+    huruf = ""
+    while n > 0:
+        n, sisa = divmod(n - 1, 26)
+        huruf = chr(65 + sisa) + huruf
+    return huruf
+
+def baris_dari_range(updated_range):
+    """'Pengukuran!A15:M15' -> 15"""
+    cocok = re.search(r"![A-Z]+(\d+)", str(updated_range))
+    return int(cocok.group(1)) if cocok else None
+
+def _versi(nilai):
+    try:
+        return int(float(str(nilai).strip() or 0))
+    except ValueError:
+        return 0
+
+
+class KonflikVersi(Exception):
+    """Baris sudah diubah/dihapus pengguna lain sejak terakhir dibaca."""
+
+
+class PengukuranStore:
+    """Snapshot sheet Pengukuran + peta No -> baris, dipakai bersama semua sesi."""
+
+    def __init__(self, worksheet, kolom):
+        self.ws = worksheet
+        self.kolom = list(kolom)                  # kolom data A.. (tanpa tombstone)
+        self._lock = threading.RLock()
+        self._kunci_muat = threading.Lock()
+        self._df = None                           # baris aktif, index = No
+        self._baris = {}                          # No -> nomor baris di sheet
+        self._id_berikut = 1
+        self._baris_terakhir = 1
+        self._kolom_tombstone = len(self.kolom) + 1
+        self._kolom_versi = len(self.kolom) + 2
+        self._versi = {}                          # No -> versi baris
+        self._kunci_baris = {}                    # No -> Lock (CAS per baris, baris lain tetap paralel)
+        self.cek_sheet = True                     # cocokkan versi di sheet sebelum menulis (antar proses)
+        self.revisi = 0
+        self.waktu_muat = None
+        self._pendengar = []                      # objek rollup: sinkron(df) / tambah(no, baris) / hapus(no)
+        self._mutasi = 0                          # naik setiap insert/update/hapus
+        self._pemuat = 0                          # jumlah muat() yang sedang membaca sheet
+        self._jurnal = []                         # mutasi selama muat() berjalan, diputar ulang saat tukar
+
+    def tambah_pendengar(self, pendengar):
+        """Daftarkan objek yang ikut diperbarui setiap muat/insert/update/hapus"""
+        with self._lock:
+            if pendengar not in self._pendengar:
+                self._pendengar.append(pendengar)
+            if self._df is not None:
+                pendengar.sinkron(self._df)
+
+    def _kabari(self, aksi, *args):
+        for pendengar in self._pendengar:
+            try:
+                getattr(pendengar, aksi)(*args)
+            except Exception as e:
+                print(f"Error pendengar {aksi}: {e}")
+
+    # ---------------- LOAD / SINKRON ----------------
+    # Sheet dibaca di luar lock (bisa beberapa detik, mis. dari penyegar latar).
+    # Insert/update/hapus yang selesai di tengah pembacaan belum tentu ikut
+    # terbaca; mutasi itu dicatat di jurnal lalu diputar ulang ke snapshot
+    # baru sebelum ditukar, supaya tidak hilang / versinya tidak mundur.
+    def muat(self):
+        """Baca seluruh sheet sekali, bangun peta ID & perbaiki ID ganda/kosong."""
+        with self._lock:
+            self._pemuat += 1
+            awal = self._mutasi
+        try:
+            self._muat(awal)
+        finally:
+            with self._lock:
+                self._pemuat -= 1
+                if not self._pemuat:
+                    self._jurnal = []
+
+    def _muat(self, awal):
+        values = self.ws.get_all_values()
+        if values and any(str(h).strip() for h in values[0]):
+            header = [str(h).strip() for h in values[0]]
+            # Pastikan kolom tombstone & versi ada di header
+            for kolom_tambahan in (KOLOM_DIHAPUS, KOLOM_VERSI):
+                if kolom_tambahan not in header:
+                    header = header + [kolom_tambahan]
+                    self.ws.update(f"{huruf_kolom(len(header))}1", [[kolom_tambahan]])
+        else:
+            # Sheet baru / kosong: tulis seluruh baris header sekaligus
+            header = self.kolom + [KOLOM_DIHAPUS, KOLOM_VERSI]
+            self.ws.update(f"A1:{huruf_kolom(len(header))}1", [header])
+
+        lebar = len(header)
+        rows, nomor_baris = [], []
+        for i, row in enumerate(values[1:], start=2):
+            if not any(str(v).strip() for v in row):
+                continue
+            rows.append((list(row) + [""] * lebar)[:lebar])
+            nomor_baris.append(i)
+
+        df = pd.DataFrame(rows, columns=header)
+        for col in self.kolom:
+            if col not in df.columns:
+                df[col] = ""
+        df["_baris"] = nomor_baris
+        df["No"] = pd.to_numeric(df["No"], errors="coerce").fillna(0).astype(int)
+
+        perbaikan = self._perbaiki_id(df)
+
+        aktif = df[df[KOLOM_DIHAPUS].astype(str).str.strip() == ""]
+        aktif = self._konversi_numerik(aktif[self.kolom + ["_baris"]].copy())
+        versi = dict(zip(df["No"], df[KOLOM_VERSI].map(_versi)))
+        aktif[KOLOM_VERSI] = aktif["No"].map(versi).astype(int)
+
+        with self._lock:
+            peta_baris = dict(zip(df["No"], df["_baris"]))
+            aktif = aktif.drop(columns=["_baris"]).set_index("No", drop=False)
+            aktif, basi = self._putar_jurnal(awal, aktif, peta_baris, versi)
+            self._baris = peta_baris
+            self._versi = versi
+            self._df = aktif
+            # Jangan mundur: ID yang sudah dialokasikan ke insert yang sedang berjalan tetap terpakai
+            self._id_berikut = max(self._id_berikut, int(df["No"].max()) + 1 if len(df) else 1)
+            self._baris_terakhir = max(peta_baris.values(), default=1)
+            self._kolom_tombstone = header.index(KOLOM_DIHAPUS) + 1
+            self._kolom_versi = header.index(KOLOM_VERSI) + 1
+            self.revisi += 1
+            # Ditandai basi oleh _cas selama pembacaan -> tetap basi
+            self.waktu_muat = 0 if basi else time.time()
+            self._kabari("sinkron", self._df)
+
+        if perbaikan:
+            self.ws.batch_update(perbaikan)
+
+    def _putar_jurnal(self, awal, aktif, peta_baris, versi):
+        """Terapkan mutasi sesudah `awal` ke hasil baca. Return (aktif, basi)."""
+        basi = False
+        for urutan, aksi, no_id, versi_baru, baris, data_list in self._jurnal:
+            if urutan <= awal:
+                continue
+            if aksi == "basi":
+                basi = True
+                continue
+            # Sheet yang terbaca sudah lebih baru (mis. diubah proses lain)
+            if versi_baru < versi.get(no_id, 0):
+                continue
+            versi[no_id] = versi_baru
+            peta_baris[no_id] = baris
+            if aksi == "hapus":
+                aktif = aktif.drop(index=no_id, errors="ignore")
+            else:
+                aktif = self._pasang(aktif, no_id, data_list, versi_baru)
+        return aktif, basi
+
+    def _perbaiki_id(self, df):
+        """ID 0/ganda (warisan penomoran lama) diberi ID baru. Return daftar update sel A."""
+        perbaikan = []
+        id_berikut = int(df["No"].max()) + 1 if len(df) else 1
+        dobel = df["No"].duplicated(keep="first") | (df["No"] <= 0)
+        for idx in df.index[dobel]:
+            df.at[idx, "No"] = id_berikut
+            perbaikan.append({"range": f"A{df.at[idx, '_baris']}", "values": [[id_berikut]]})
+            id_berikut += 1
+        return perbaikan
+
+    @staticmethod
+    def _konversi_numerik(df):
+        for col in KOLOM_NUMERIK:
+            if col in df.columns and col != "No":
+                df[col] = pd.to_numeric(df[col].astype(str).str.replace(",", "."), errors="coerce")
+        return df
+
+    def _basi(self, maks_umur):
+        return self._df is None or (maks_umur is not None and time.time() - self.waktu_muat > maks_umur)
+
+    def segarkan(self, maks_umur=None):
+        """Muat ulang bila belum pernah dimuat / lebih tua dari maks_umur detik."""
+        if not self._basi(maks_umur):
+            return
+        # Banyak sesi bisa mendapati snapshot basi bersamaan: hanya satu yang membaca sheet
+        with self._kunci_muat:
+            if self._basi(maks_umur):
+                self.muat()
+
+    def snapshot(self, maks_umur=None):
+        """Salinan baris aktif (lihat segarkan)."""
+        self.segarkan(maks_umur)
+        with self._lock:
+            return self._df.reset_index(drop=True)
+
+    def nomor_baris(self, no_id):
+        with self._lock:
+            return self._baris.get(int(no_id))
+
+    def ambil(self, no_id):
+        """(dict baris, versi) satu ID dari memori, tanpa menyalin seluruh snapshot."""
+        self.segarkan()
+        no_id = int(no_id)
+        with self._lock:
+            if no_id not in self._df.index:
+                raise KeyError(f"Data No {no_id} tidak ditemukan")
+            return self._df.loc[no_id, self.kolom].to_dict(), self._versi.get(no_id, 0)
+
+    # ---------------- MUTASI ----------------
+    def insert(self, data_list):
+        """Tambah baris. Kolom No diisi ID baru dari store. Return ID."""
+        self.segarkan()
+        with self._lock:
+            no_id = self._id_berikut
+            self._id_berikut += 1
+            lebar = max(self._kolom_tombstone, self._kolom_versi)
+            kolom_versi = self._kolom_versi
+
+        data_list = list(data_list)
+        data_list[0] = no_id
+        baris_sheet = (data_list + [""] * lebar)[:lebar]
+        baris_sheet[kolom_versi - 1] = 1
+
+        # Append di luar lock: sisipan dari banyak kader berjalan paralel,
+        # ID sudah unik karena dialokasikan di dalam lock
+        resp = self.ws.append_row(baris_sheet, value_input_option="USER_ENTERED")
+        baris = baris_dari_range((resp or {}).get("updates", {}).get("updatedRange"))
+
+        with self._lock:
+            if baris is None:
+                baris = self._baris_terakhir + 1
+            self._baris_terakhir = max(self._baris_terakhir, baris)
+            self._baris[no_id] = baris
+            self._versi[no_id] = 1
+            self._catat("tulis", no_id, data_list)
+            self._terapkan(no_id, data_list)
+        return no_id
+
+    def update(self, no_id, data_list, versi=None):
+        """
+        Tulis ulang satu baris (A..L) berdasarkan ID.
+        versi: versi yang dilihat pengguna (kolom Versi di snapshot); None = versi terkini.
+        """
+        no_id = int(no_id)
+        with self._kunci(no_id):
+            baris, versi_kini = self._cas(no_id, versi)
+            data_list = list(data_list)
+            data_list[0] = no_id
+            self.ws.batch_update([
+                {"range": f"A{baris}:{huruf_kolom(len(self.kolom))}{baris}", "values": [data_list]},
+                {"range": f"{huruf_kolom(self._kolom_versi)}{baris}", "values": [[versi_kini + 1]]},
+            ], value_input_option="USER_ENTERED")
+            with self._lock:
+                self._versi[no_id] = versi_kini + 1
+                self._catat("tulis", no_id, data_list)
+                self._terapkan(no_id, data_list)
+
+    def hapus(self, no_id, versi=None):
+        """Soft delete: isi kolom Dihapus, baris fisik tetap di tempat."""
+        no_id = int(no_id)
+        with self._kunci(no_id):
+            baris, versi_kini = self._cas(no_id, versi)
+            self.ws.batch_update([
+                {"range": f"{huruf_kolom(self._kolom_tombstone)}{baris}", "values": [[1]]},
+                {"range": f"{huruf_kolom(self._kolom_versi)}{baris}", "values": [[versi_kini + 1]]},
+            ])
+            with self._lock:
+                self._versi[no_id] = versi_kini + 1
+                self._catat("hapus", no_id)
+                self._df = self._df.drop(index=no_id)
+                self.revisi += 1
+                self._kabari("hapus", no_id)
+
+    def _kunci(self, no_id):
+        with self._lock:
+            return self._kunci_baris.setdefault(no_id, threading.Lock())
+
+    def _cas(self, no_id, versi):
+        """Bandingkan versi; return (nomor baris, versi kini) atau KonflikVersi."""
+        with self._lock:
+            baris = self._baris_aktif(no_id)
+            versi_kini = self._versi.get(no_id, 0)
+        if versi is not None and int(versi) != versi_kini:
+            raise KonflikVersi(f"Data No {no_id} sudah diubah pengguna lain (versi {versi} -> {versi_kini}), muat ulang data")
+
+        if self.cek_sheet:
+            # Perubahan dari proses/instance lain hanya terlihat di sheet
+            nilai = self.ws.get(f"{huruf_kolom(self._kolom_versi)}{baris}")
+            versi_sheet = _versi(nilai[0][0] if nilai and nilai[0] else 0)
+            if versi_sheet != versi_kini:
+                with self._lock:
+                    self.waktu_muat = 0           # snapshot basi -> dimuat ulang pada akses berikutnya
+                    self._catat("basi", no_id)
+                raise KonflikVersi(f"Data No {no_id} sudah diubah di sheet (versi {versi_sheet}), muat ulang data")
+        return baris, versi_kini
+
+    def _baris_aktif(self, no_id):
+        if self._df is None:
+            self.muat()
+        if no_id not in self._baris or no_id not in self._df.index:
+            raise KonflikVersi(f"Data No {no_id} tidak ditemukan (mungkin sudah dihapus)")
+        return self._baris[no_id]
+
+    def _catat(self, aksi, no_id, data_list=None):
+        """Naikkan penghitung mutasi; catat ke jurnal bila ada muat() yang sedang membaca."""
+        self._mutasi += 1
+        if self._pemuat:
+            self._jurnal.append((self._mutasi, aksi, no_id, self._versi.get(no_id, 0),
+                                 self._baris.get(no_id), data_list))
+
+    def _pasang(self, df, no_id, data_list, versi):
+        """Tulis satu baris (berdasarkan ID) ke df; return df."""
+        baris_df = self._konversi_numerik(pd.DataFrame([data_list], columns=self.kolom))
+        baris_df["No"] = no_id
+        baris_df[KOLOM_VERSI] = versi
+        baris_df = baris_df.set_index("No", drop=False)
+        if no_id in df.index:
+            df.loc[no_id, self.kolom + [KOLOM_VERSI]] = baris_df.loc[no_id, self.kolom + [KOLOM_VERSI]]
+            return df
+        return pd.concat([df, baris_df])
+
+    def _terapkan(self, no_id, data_list):
+        self._df = self._pasang(self._df, no_id, data_list, self._versi.get(no_id, 0))
+        self.revisi += 1
+        self._kabari("tambah", no_id, self._df.loc[no_id])
+
+
+# ======================================================
+# SNAPSHOT LEMBAR SEDERHANA (BALITA)
+# ======================================================
+class SnapshotLembar:
+    """Snapshot satu worksheet (get_all_records), dimuat ulang lalu ditukar sekaligus."""
+
+    def __init__(self, worksheet, rapikan=None):
+        self.ws = worksheet
+        self.rapikan = rapikan or (lambda df: df)
+        self._lock = threading.Lock()
+        self._kunci_muat = threading.Lock()
+        self._df = None
+        self.revisi = 0
+        self.waktu_muat = None
+        self._mutasi = 0                          # naik setiap lembar ditulis (tandai_berubah)
+
+    def muat(self):
+        # Dibaca & dirapikan di luar lock: pembaca tetap dilayani snapshot lama
+        with self._lock:
+            awal = self._mutasi
+        df = self.rapikan(pd.DataFrame(self.ws.get_all_records()))
+        with self._lock:
+            # Lembar ditulis selama dibaca: hasil ini mungkin belum memuat tulisan
+            # tersebut, jangan timpa snapshot dari muat() sesudah tulis
+            basi = self._mutasi != awal
+            if basi and self._df is not None:
+                return
+            self._df = df
+            self.revisi += 1
+            self.waktu_muat = 0 if basi else time.time()
+
+    def tandai_berubah(self):
+        """Dipanggil setelah menulis ke lembar: snapshot basi sampai dimuat ulang."""
+        with self._lock:
+            self._mutasi += 1
+            if self._df is not None:
+                self.waktu_muat = 0
+
+    def _basi(self, maks_umur):
+        return self._df is None or (maks_umur is not None and time.time() - self.waktu_muat > maks_umur)
+
+    def segarkan(self, maks_umur=None):
+        if not self._basi(maks_umur):
+            return
+        with self._kunci_muat:
+            if self._basi(maks_umur):
+                self.muat()
+
+    def snapshot(self, maks_umur=None):
+        self.segarkan(maks_umur)
+        with self._lock:
+            return self._df.copy()
+
+
+# ======================================================
+# PENYEGAR LATAR (STALE-WHILE-REVALIDATE)
+# ======================================================
+# Satu thread per proses menjaga snapshot tetap segar, sehingga rerun
+# pengguna tidak pernah menunggu unduhan sheet:
+# - tiap `interval` detik cek waktu ubah spreadsheet (Drive modifiedTime,
+#   satu panggilan ringan), sheet hanya dibaca ulang bila waktu itu berubah
+# - bila waktu ubah tidak bisa dibaca, muat ulang setelah `maks_umur` detik
+# - snapshot yang belum pernah dimuat / ditandai basi (waktu_muat = 0,
+#   mis. setelah KonflikVersi) langsung dimuat di latar
+# - snapshot baru ditukar di dalam lock masing-masing; pembaca memakai
+#   snapshot terakhir yang berhasil dimuat
+
+def waktu_ubah_spreadsheet(spreadsheet):
+    """Drive modifiedTime spreadsheet (string ISO) via gspread"""
+    return spreadsheet.get_lastUpdateTime()
+
+
+class PenyegarLatar:
+    def __init__(self, interval=30, maks_umur=300):
+        self.interval = interval
+        self.maks_umur = maks_umur
+        self._target = {}                     # kunci -> {"spreadsheet", "snapshot": [...], "waktu_ubah", "dicek", "galat"}
+        self._lock = threading.Lock()
+        self._berhenti = threading.Event()
+        self._thread = None
+
+    def daftarkan(self, kunci, spreadsheet, snapshot):
+        """
+        Tambahkan snapshot (PengukuranStore / SnapshotLembar) milik satu spreadsheet.
+        Waktu ubah dibaca saat pertama didaftarkan (sebelum snapshot dimuat),
+        jadi perubahan sesudahnya pasti terdeteksi pada putaran berikutnya.
+        """
+        with self._lock:
+            baru = kunci not in self._target
+        waktu = None
+        if baru:
+            try:
+                waktu = waktu_ubah_spreadsheet(spreadsheet)
+            except Exception:
+                pass
+        with self._lock:
+            target = self._target.setdefault(kunci, {
+                "spreadsheet": spreadsheet, "snapshot": [], "waktu_ubah": waktu, "dicek": None, "galat": None,
+            })
+            if snapshot not in target["snapshot"]:
+                target["snapshot"].append(snapshot)
+
+    def mulai(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._berhenti.clear()
+                self._thread = threading.Thread(target=self._jalan, name="penyegar-sheet", daemon=True)
+                self._thread.start()
+
+    def hidup(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def berhenti(self):
+        self._berhenti.set()
+
+    def _jalan(self):
+        while not self._berhenti.is_set():
+            self.putaran()
+            self._berhenti.wait(self.interval)
+
+    def putaran(self):
+        """Satu kali cek semua spreadsheet terdaftar"""
+        with self._lock:
+            daftar = list(self._target.values())
+        for target in daftar:
+            try:
+                self._segarkan_target(target)
+                target["galat"] = None
+            except Exception as e:
+                target["galat"] = str(e)
+                print(f"Error penyegar latar: {e}")
+
+    def _segarkan_target(self, target):
+        waktu_cek = time.time()
+        try:
+            waktu = waktu_ubah_spreadsheet(target["spreadsheet"])
+        except Exception:
+            waktu = None
+
+        berubah = waktu is not None and target["waktu_ubah"] is not None and waktu != target["waktu_ubah"]
+        for snap in list(target["snapshot"]):
+            perlu = (berubah or not snap.waktu_muat
+                     or (waktu is None and time.time() - snap.waktu_muat > self.maks_umur))
+            if perlu:
+                with snap._kunci_muat:
+                    snap.muat()
+        if waktu is not None:
+            target["waktu_ubah"] = waktu
+            target["dicek"] = waktu_cek
+
+    def umur(self, kunci):
+        """
+        Detik sejak data spreadsheet terakhir dipastikan terkini: waktu cek
+        (modifiedTime tidak berubah) atau snapshot tertua dimuat. None bila belum pernah.
+        """
+        with self._lock:
+            target = self._target.get(kunci)
+        if target is None:
+            return None
+        waktu_muat = [s.waktu_muat for s in target["snapshot"]]
+        if not waktu_muat or not all(waktu_muat):
+            return None
+        terkini = min(waktu_muat)
+        if target["dicek"] is not None and target["galat"] is None:
+            terkini = max(terkini, target["dicek"])
+        return time.time() - terkini
@@ -0,0 +1,168 @@
+# ============================== skor_zscore.py ==============================
+"""
+Hitung umur, z-score & status gizi WHO untuk file pengukuran besar tanpa UI.
+
+Contoh:
+    python skor_zscore.py survei.csv hasil.csv
+    python skor_zscore.py survei.parquet hasil.parquet --chunk 200000 --proses 4
+
+Kolom input: Tanggal Lahir, Tanggal Pengukuran, Jenis Kelamin, BB, TB
+(tanggal dd-mm-yyyy seperti di sheet). Bila Tanggal Lahir tidak ada,
+kolom Umur (bulan) dipakai apa adanya. Semua kolom input ikut ditulis,
+ditambah Umur, Z-Score & Status BB/U, TB/U, BB/TB.
+
+File dibaca dan ditulis per potongan (--chunk baris), jadi memori tetap
+walau input jutaan baris. --proses N menghitung potongan di N proses;
+urutan baris output tetap sama dengan input.
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils import (load_semua_lms, hitung_umur_bulan_series, hitung_z_vektor,
+                   status_bbu_vektor, status_tbu_vektor, status_bbtb_vektor)
+
+KOLOM_WAJIB = ["Tanggal Pengukuran", "Jenis Kelamin", "BB", "TB"]
+
+# Tabel LMS dimuat sekali per proses
+_LMS = None
+
+
+def _lms():
+    global _LMS
+    if _LMS is None:
+        _LMS = load_semua_lms()
+    return _LMS
+
+
+# ======================================================
+# BACA / TULIS PER POTONGAN
+# ======================================================
+def baca_potongan(path, ukuran):
+    if path.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=ukuran):
+            yield batch.to_pandas()
+    else:
+        # Tanggal & jenis kelamin dibaca sebagai teks, diparse di skor_potongan
+        yield from pd.read_csv(path, chunksize=ukuran, dtype={"Tanggal Lahir": str, "Tanggal Pengukuran": str,
+                                                              "Jenis Kelamin": str})
+
+
+class PenulisHasil:
+    """Tulis potongan hasil berurutan ke CSV / Parquet (skema mengikuti potongan pertama)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.lower().endswith(".parquet")
+        self._penulis = None
+        self._skema = None
+        self._awal = True
+
+    def tulis(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._penulis is None:
+                tabel = pa.Table.from_pandas(df, preserve_index=False)
+                self._skema = tabel.schema
+                self._penulis = pq.ParquetWriter(self.path, self._skema)
+            else:
+                tabel = pa.Table.from_pandas(df, schema=self._skema, preserve_index=False)
+            self._penulis.write_table(tabel)
+        else:
+            df.to_csv(self.path, mode="w" if self._awal else "a", header=self._awal, index=False)
+        self._awal = False
+
+    def tutup(self):
+        if self._penulis is not None:
+            self._penulis.close()
+
+
+# ======================================================
+# SKOR SATU POTONGAN
+# ======================================================
+def skor_potongan(df):
+    kurang = [k for k in KOLOM_WAJIB if k not in df.columns]
+    if "Tanggal Lahir" not in df.columns and "Umur" not in df.columns:
+        kurang.append("Tanggal Lahir / Umur")
+    if kurang:
+        raise ValueError(f"Kolom tidak ditemukan: {', '.join(kurang)}")
+
+    df = df.copy()
+    if "Tanggal Lahir" in df.columns:
+        df["Umur"] = hitung_umur_bulan_series(df["Tanggal Lahir"], df["Tanggal Pengukuran"]).to_numpy()
+
+    lms_bbu, lms_tbu, lms_bbtb = _lms()
+    z_bbu, z_tbu, z_bbtb = hitung_z_vektor(df["BB"], df["TB"], df["Umur"], df["Jenis Kelamin"],
+                                           lms_bbu, lms_tbu, lms_bbtb)
+
+    # Pembulatan & nama kolom sama dengan sheet Pengukuran
+    df["Z-Score BB/U"] = np.round(z_bbu, 2)
+    df["Status BB/U"] = status_bbu_vektor(z_bbu)
+    df["Z-Score TB/U"] = np.round(z_tbu, 2)
+    df["Status TB/U"] = status_tbu_vektor(z_tbu)
+    df["Z-Score BB/TB"] = np.round(z_bbtb, 2)
+    df["Status BB/TB"] = status_bbtb_vektor(z_bbtb)
+    return df
+
+
+def _hasil_berurutan(potongan, proses):
+    """Potongan hasil sesuai urutan input; maksimal 2 x proses potongan di memori"""
+    if proses <= 1:
+        for df in potongan:
+            yield skor_potongan(df)
+        return
+
+    with ProcessPoolExecutor(max_workers=proses) as pool:
+        antre = deque()
+        for df in potongan:
+            antre.append(pool.submit(skor_potongan, df))
+            if len(antre) >= 2 * proses:
+                yield antre.popleft().result()
+        while antre:
+            yield antre.popleft().result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Skor z-score WHO untuk file pengukuran (CSV/Parquet)")
+    parser.add_argument("input", help="File pengukuran .csv / .parquet")
+    parser.add_argument("output", help="File hasil .csv / .parquet")
+    parser.add_argument("--chunk", type=int, default=100_000, help="Baris per potongan")
+    parser.add_argument("--proses", type=int, default=1, help="Jumlah proses paralel")
+    args = parser.parse_args()
+
+    penulis = PenulisHasil(args.output)
+    total, gagal = 0, 0
+    t0 = time.perf_counter()
+    try:
+        for df in _hasil_berurutan(baca_potongan(args.input, args.chunk), args.proses):
+            penulis.tulis(df)
+            total += len(df)
+            gagal += int(df[["Z-Score BB/U", "Z-Score TB/U", "Z-Score BB/TB"]].isna().any(axis=1).sum())
+            durasi = time.perf_counter() - t0
+            print(f"\r{total:,} baris | {total / durasi:,.0f} baris/detik", end="", file=sys.stderr, flush=True)
+    except ValueError as e:
+        print(f"\n❌ {e}", file=sys.stderr)
+        raise SystemExit(1)
+    finally:
+        penulis.tutup()
+
+    durasi = time.perf_counter() - t0
+    print(f"\n✅ {total:,} baris dalam {durasi:.1f} detik ({total / max(durasi, 1e-9):,.0f} baris/detik) "
+          f"-> {os.path.abspath(args.output)}")
+    if gagal:
+        print(f"⚠️ {gagal:,} baris dengan z-score kosong (LMS tidak ditemukan / nilai tidak valid)")
+
+
+if __name__ == "__main__":
+    main()
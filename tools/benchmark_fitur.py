@@ -0,0 +1,38 @@
+# ============================== tools/benchmark_fitur.py ==============================
+"""
+Benchmark waktu bangun fitur model di atas riwayat sintetis besar.
+
+    python tools/benchmark_fitur.py --anak 1000 10000 50000 --kunjungan 24
+"""
+
+import argparse
+import time
+
+from sintetis import buat_balita, buat_pengukuran
+from fitur_utils import bangun_fitur
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bangun_fitur()")
+    parser.add_argument("--anak", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--kunjungan", type=int, default=24, help="Kunjungan per anak")
+    parser.add_argument("--ulang", type=int, default=3, help="Pengulangan per ukuran (ambil tercepat)")
+    args = parser.parse_args()
+
+    print(f"{'anak':>8} {'baris':>10} {'detik':>8} {'baris/detik':>12}")
+    for n_anak in args.anak:
+        df_balita = buat_balita(n_anak)
+        df_pengukuran = buat_pengukuran(df_balita, args.kunjungan)
+
+        terbaik = float("inf")
+        for _ in range(args.ulang):
+            t0 = time.perf_counter()
+            fitur = bangun_fitur(df_pengukuran, df_balita)
+            terbaik = min(terbaik, time.perf_counter() - t0)
+
+        assert len(fitur) == df_pengukuran["Nama Anak"].nunique()
+        print(f"{n_anak:>8} {len(df_pengukuran):>10} {terbaik:>8.2f} {len(df_pengukuran) / terbaik:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
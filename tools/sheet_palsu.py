@@ -0,0 +1,204 @@
+# ============================== tools/sheet_palsu.py ==============================
+
+import re
+import threading
+import time
+from collections import Counter
+
+# ======================================================
+# WORKSHEET PALSU (OFFLINE, THREAD-SAFE)
+# ======================================================
+# Meniru subset API gspread.Worksheet yang dipakai aplikasi, disimpan di memori.
+# Dipakai untuk uji konkurensi & uji beban tanpa menyentuh Google Sheets.
+# - latensi: jeda per panggilan (detik) untuk meniru round-trip jaringan
+# - panggilan: Counter nama method -> jumlah panggilan API
+
+_SEL = re.compile(r"^([A-Z]*)(\d*)$")
+
+
+def _indeks_kolom(huruf):
+    n = 0
+    for h in huruf:
+        n = n * 26 + ord(h) - 64
+    return n
+
+
+def _parse_range(rentang):
+    """'Sheet!A2:L2' / 'M5' / '3:3' -> (baris1, kolom1, baris2, kolom2), None = tak terbatas"""
+    rentang = str(rentang).split("!")[-1]
+    awal, _, akhir = rentang.partition(":")
+    akhir = akhir or awal
+    (k1, b1), (k2, b2) = _SEL.match(awal).groups(), _SEL.match(akhir).groups()
+    return (int(b1) if b1 else None, _indeks_kolom(k1) if k1 else None,
+            int(b2) if b2 else None, _indeks_kolom(k2) if k2 else None)
+
+
+class LembarPalsu:
+    def __init__(self, rows=None, title="Sheet1", latensi=0.0):
+        self.title = title
+        self.latensi = latensi
+        self.panggilan = Counter()
+        self._rows = [list(map(self._teks, r)) for r in (rows or [])]
+        self._lock = threading.Lock()
+        self.diubah = 0                   # penghitung tulis, dipakai sebagai "modifiedTime"
+
+    @staticmethod
+    def _teks(v):
+        # Google Sheets mengembalikan semua nilai sebagai string
+        return "" if v is None else str(v)
+
+    def _api(self, nama):
+        self.panggilan[nama] += 1
+        if self.latensi:
+            time.sleep(self.latensi)
+
+    def _tulis_sel(self, baris, kolom, nilai):
+        while len(self._rows) < baris:
+            self._rows.append([])
+        row = self._rows[baris - 1]
+        while len(row) < kolom:
+            row.append("")
+        row[kolom - 1] = self._teks(nilai)
+
+    def _tulis_range(self, rentang, values):
+        b1, k1, _, _ = _parse_range(rentang)
+        for i, row in enumerate(values):
+            for j, nilai in enumerate(row):
+                self._tulis_sel((b1 or 1) + i, (k1 or 1) + j, nilai)
+
+    def _baca_range(self, rentang):
+        b1, k1, b2, k2 = _parse_range(rentang)
+        b1, k1 = b1 or 1, k1 or 1
+        b2 = b2 or len(self._rows)
+        hasil = []
+        for row in self._rows[b1 - 1:b2]:
+            hasil.append(list(row[k1 - 1:k2] if k2 else row[k1 - 1:]))
+        while hasil and not any(hasil[-1]):
+            hasil.pop()
+        return hasil
+
+    # ---------------- BACA ----------------
+    def get_all_values(self):
+        self._api("get_all_values")
+        with self._lock:
+            return [list(r) for r in self._rows]
+
+    def get_all_records(self):
+        self._api("get_all_records")
+        with self._lock:
+            if not self._rows:
+                return []
+            header = self._rows[0]
+            return [dict(zip(header, r + [""] * (len(header) - len(r)))) for r in self._rows[1:]]
+
+    def get(self, rentang):
+        self._api("get")
+        with self._lock:
+            return self._baca_range(rentang)
+
+    def batch_get(self, daftar_range):
+        self._api("batch_get")
+        with self._lock:
+            return [self._baca_range(r) for r in daftar_range]
+
+    def row_values(self, baris):
+        self._api("row_values")
+        with self._lock:
+            return list(self._rows[baris - 1]) if baris <= len(self._rows) else []
+
+    def col_values(self, kolom):
+        self._api("col_values")
+        with self._lock:
+            return [r[kolom - 1] if len(r) >= kolom else "" for r in self._rows]
+
+    # ---------------- TULIS ----------------
+    def append_row(self, values, value_input_option=None):
+        self._api("append_row")
+        with self._lock:
+            self.diubah += 1
+            self._rows.append([self._teks(v) for v in values])
+            baris = len(self._rows)
+        return {"updates": {"updatedRange": f"{self.title}!A{baris}:{baris}"}}
+
+    def update(self, rentang, values, value_input_option=None):
+        self._api("update")
+        with self._lock:
+            self.diubah += 1
+            self._tulis_range(rentang, values)
+
+    def batch_update(self, data, value_input_option=None):
+        self._api("batch_update")
+        with self._lock:
+            self.diubah += 1
+            for item in data:
+                self._tulis_range(item["range"], item["values"])
+
+    def delete_rows(self, baris):
+        self._api("delete_rows")
+        with self._lock:
+            self.diubah += 1
+            del self._rows[baris - 1]
+
+
+class SpreadsheetPalsu:
+    """Pengganti gspread.Spreadsheet: worksheet(nama) -> LembarPalsu"""
+
+    def __init__(self, lembar, latensi=0.0):
+        self._lembar = dict(lembar)
+        self.latensi = latensi
+        self.panggilan = Counter()
+
+    def worksheet(self, nama):
+        return self._lembar[nama]
+
+    def get_lastUpdateTime(self):
+        """Meniru Drive modifiedTime: berubah setiap ada penulisan di sheet mana pun"""
+        self.panggilan["get_lastUpdateTime"] += 1
+        if self.latensi:
+            time.sleep(self.latensi)
+        return str(sum(lembar.diubah for lembar in self._lembar.values()))
+
+
+class KlienPalsu:
+    """
+    Pengganti klien gspread: open_by_key(id) -> spreadsheet berisi sheet
+    Balita & Pengukuran sintetis (n_anak balita per spreadsheet).
+    """
+
+    def __init__(self, n_anak=300, kunjungan_per_anak=24, latensi=0.0):
+        self.n_anak = n_anak
+        self.kunjungan_per_anak = kunjungan_per_anak
+        self.latensi = latensi
+        self._spreadsheet = {}
+        self._lock = threading.Lock()
+
+    def open_by_key(self, spreadsheet_id):
+        with self._lock:
+            if spreadsheet_id not in self._spreadsheet:
+                self._spreadsheet[spreadsheet_id] = self._buat(len(self._spreadsheet))
+            return self._spreadsheet[spreadsheet_id]
+
+    def _buat(self, seed):
+        from tools.sintetis import buat_balita, buat_pengukuran
+
+        df_balita = buat_balita(self.n_anak, seed=seed)
+        df_pengukuran = buat_pengukuran(df_balita, self.kunjungan_per_anak, seed=seed)
+        kolom_balita = ["Nama Anak", "Tanggal Lahir", "Jenis Kelamin", "Nama Ibu",
+                        "Desa", "Dusun", "Alamat", "RT", "RW", "Posyandu"]
+        df_balita["Posyandu"] = ""
+        return SpreadsheetPalsu({
+            "Balita": LembarPalsu([kolom_balita] + df_balita[kolom_balita].values.tolist(),
+                                  title="Balita", latensi=self.latensi),
+            "Pengukuran": LembarPalsu([list(df_pengukuran.columns)] + df_pengukuran.values.tolist(),
+                                      title="Pengukuran", latensi=self.latensi),
+        }, latensi=self.latensi)
+
+    def panggilan(self):
+        """Total panggilan API semua sheet: Counter method -> jumlah"""
+        total = Counter()
+        with self._lock:
+            for sh in self._spreadsheet.values():
+                total.update(sh.panggilan)
+                for lembar in sh._lembar.values():
+                    total.update(lembar.panggilan)
+        return total
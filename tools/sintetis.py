@@ -0,0 +1,73 @@
+# ============================== tools/sintetis.py ==============================
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import status_bbu, status_tbu, status_bbtb
+
+# ======================================================
+# DATA SINTETIS (BENCHMARK & UJI BEBAN)
+# ======================================================
+# RT/RW yang valid di Desa Mlese, diambil bergiliran
+_RT_RW = [(1, 6), (2, 4), (3, 2), (1, 1), (2, 7)]
+
+
+def buat_balita(n_anak, seed=0):
+    rng = np.random.default_rng(seed)
+    lahir = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, n_anak), unit="D")
+    rt, rw = zip(*[_RT_RW[i % len(_RT_RW)] for i in range(n_anak)])
+    return pd.DataFrame({
+        "Nama Anak": [f"ANAK {i:06d}" for i in range(n_anak)],
+        "Nama Ibu": [f"IBU {i:06d}" for i in range(n_anak)],
+        "Tanggal Lahir": lahir.strftime("%d-%m-%Y"),
+        "Jenis Kelamin": rng.choice(["L", "P"], n_anak),
+        "Desa": "MLESE",
+        "Dusun": "",
+        "Alamat": "",
+        "RT": rt,
+        "RW": rw,
+    })
+
+
+def buat_pengukuran(df_balita, kunjungan_per_anak=24, p_absen=0.2, seed=0):
+    """Riwayat bulanan per anak: z-score random walk, sebagian bulan dilewati"""
+    rng = np.random.default_rng(seed)
+    n_anak = len(df_balita)
+    n = n_anak * kunjungan_per_anak
+
+    anak = np.repeat(np.arange(n_anak), kunjungan_per_anak)
+    bulan_ke = np.tile(np.arange(kunjungan_per_anak), n_anak)
+    hadir = rng.random(n) > p_absen
+
+    lahir = pd.to_datetime(df_balita["Tanggal Lahir"], dayfirst=True).to_numpy()[anak]
+    tanggal = pd.DatetimeIndex(lahir) + pd.to_timedelta(bulan_ke * 30 + rng.integers(0, 5, n), unit="D")
+
+    z = np.cumsum(rng.normal(0, 0.25, (3, n)), axis=1)
+    z -= np.repeat(z[:, ::kunjungan_per_anak], kunjungan_per_anak, axis=1)  # mulai dari ~0 per anak
+    z += rng.normal(0, 1, (3, n_anak)).repeat(kunjungan_per_anak, axis=1)
+
+    umur = bulan_ke
+    bb = np.round(3.3 + umur * 0.25 + z[0] * 1.0, 1)
+    tb = np.round(50 + umur * 1.2 + z[1] * 2.5, 1)
+
+    df = pd.DataFrame({
+        "Nama Anak": df_balita["Nama Anak"].to_numpy()[anak],
+        "Tanggal Pengukuran": tanggal.strftime("%d-%m-%Y"),
+        "Umur": umur,
+        "BB": bb,
+        "TB": tb,
+        "Z-Score BB/U": np.round(z[0], 2),
+        "Z-Score TB/U": np.round(z[1], 2),
+        "Z-Score BB/TB": np.round(z[2], 2),
+    })[hadir].reset_index(drop=True)
+
+    df.insert(0, "No", np.arange(1, len(df) + 1))
+    df.insert(7, "Status BB/U", [status_bbu(v) for v in df["Z-Score BB/U"]])
+    df.insert(9, "Status TB/U", [status_tbu(v) for v in df["Z-Score TB/U"]])
+    df["Status BB/TB"] = [status_bbtb(v) for v in df["Z-Score BB/TB"]]
+    return df
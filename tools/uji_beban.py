@@ -0,0 +1,213 @@
+# ============================== tools/uji_beban.py ==============================
+"""
+Uji beban: N sesi Streamlit bersamaan per halaman (AppTest) di atas backend palsu.
+
+    python tools/uji_beban.py --pengguna 1 10 25 --ulang 2
+    python tools/uji_beban.py --halaman Dashboard Monitoring --latensi 0.05 --anak 2000
+
+Setiap sesi menjalankan skenario interaksi widget halaman (cari, filter,
+paginasi, ganti mode). Dilaporkan per halaman:
+- latensi per run() (p50 / p90 / p99 / maks)
+- jumlah panggilan API sheet per run
+- memori session_state per sesi (DataFrame dihitung deep)
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+AKAR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AKAR)
+os.chdir(AKAR)                                   # halaman membaca data/lms_*.csv relatif
+os.environ.setdefault("GIZI_BACKEND", "palsu")
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")   # sembunyikan peringatan AppTest per run
+
+from unittest.mock import MagicMock
+
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.testing.v1 import AppTest
+
+
+def pasang_runtime_bersama():
+    """
+    AppTest memasang Runtime tiruan global di awal run() dan menghapusnya
+    (Runtime._instance = None) di akhir, sehingga sesi paralel saling
+    mematikan. Untuk uji beban semua sesi memakai satu runtime tiruan,
+    sama seperti satu proses server Streamlit melayani banyak sesi.
+    """
+    bersama = MagicMock(spec=Runtime)
+    bersama.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    bersama.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: bersama)
+    Runtime.exists = classmethod(lambda cls: True)
+
+
+# ======================================================
+# SKENARIO PER HALAMAN
+# ======================================================
+def _widget(daftar, label):
+    for w in daftar:
+        if w.label == label:
+            return w
+    raise LookupError(f"Widget '{label}' tidak ditemukan")
+
+
+def _pilih(daftar, label, indeks=1):
+    w = _widget(daftar, label)
+    return w.select_index(min(indeks, len(w.options) - 1))
+
+
+SKENARIO = {
+    "Dashboard": ("pages/1_Dashboard.py", [
+        ("buka", None),
+        ("tren per bulan", lambda at: _widget(at.radio, "Periode").set_value("Per Bulan")),
+        ("drill-down posyandu", lambda at: _pilih(at.sidebar.selectbox, "🏥 Posyandu")),
+    ]),
+    "Data Balita": ("pages/2_Data_Balita.py", [
+        ("buka", None),
+        ("halaman 2", lambda at: at.number_input(key="hal_balita").set_value(2)),
+        ("cari awalan", lambda at: _widget(at.text_input, "🔍 Cari Nama Anak / Nama Ibu (awalan)").input("ANAK 0001")),
+        ("100 baris", lambda at: _pilih(at.selectbox, "Baris / halaman", 2)),
+    ]),
+    "Input Pengukuran": ("pages/3_Input_Pengukuran.py", [
+        ("buka", None),
+        ("cari balita", lambda at: _widget(at.text_input, "🔍 Cari Balita (nama anak / nama ibu)").input("ANAK 00002")),
+        ("pilih balita", lambda at: _pilih(at.selectbox, "Pilih Balita")),
+        ("filter riwayat", lambda at: _widget(at.text_input, "Nama Anak (awalan)").input("ANAK 0001")),
+    ]),
+    "Monitoring": ("pages/4_Monitoring.py", [
+        ("buka", None),
+        ("cari anak", lambda at: _widget(at.text_input, "🔍 Cari Balita").input("ANAK 0000")),
+        ("seluruh data", lambda at: _widget(at.radio, "Mode Tampilan").set_value("Seluruh Data")),
+    ]),
+    "Laporan": ("pages/5_Laporan.py", [
+        ("buka", None),
+        ("buat laporan", lambda at: _widget(at.button, "📄 Buat Laporan").click()),
+    ]),
+}
+
+
+# ======================================================
+# PENGUKURAN
+# ======================================================
+def ukuran_objek(nilai):
+    """Perkiraan byte satu nilai session_state (DataFrame/Series dihitung deep)"""
+    if isinstance(nilai, pd.DataFrame):
+        return int(nilai.memory_usage(deep=True).sum())
+    if isinstance(nilai, pd.Series):
+        return int(nilai.memory_usage(deep=True))
+    if isinstance(nilai, dict):
+        return sys.getsizeof(nilai) + sum(ukuran_objek(v) for v in nilai.values())
+    if isinstance(nilai, (list, tuple, set)):
+        return sys.getsizeof(nilai) + sum(ukuran_objek(v) for v in nilai)
+    if isinstance(nilai, (bytes, bytearray)):
+        return len(nilai)
+    return sys.getsizeof(nilai)
+
+
+def memori_sesi(at):
+    state = at.session_state
+    return sum(ukuran_objek(state[k]) for k in state.filtered_state)
+
+
+def panggilan_api():
+    import gsheet_utils
+    return gsheet_utils.client.panggilan() if hasattr(gsheet_utils.client, "panggilan") else Counter()
+
+
+def sesi(path, langkah, ulang, timeout, hasil, kunci):
+    """Satu pengguna: jalankan skenario `ulang` kali dalam satu sesi"""
+    catatan = {"latensi": defaultdict(list), "memori": 0, "galat": []}
+    at = AppTest.from_file(path, default_timeout=timeout)
+    for _ in range(ulang):
+        for nama, aksi in langkah:
+            try:
+                if aksi is not None:
+                    aksi(at)
+                t0 = time.perf_counter()
+                at.run()
+                catatan["latensi"][nama].append(time.perf_counter() - t0)
+                if at.exception:
+                    catatan["galat"].append(f"{nama}: {at.exception[0].message}")
+            except Exception as e:
+                catatan["galat"].append(f"{nama}: {e}")
+    catatan["memori"] = memori_sesi(at)
+    hasil[kunci] = catatan
+
+
+def uji_halaman(nama, n_pengguna, ulang, timeout):
+    path, langkah = SKENARIO[nama]
+    path = os.path.join(AKAR, path)
+    api_awal = panggilan_api()
+
+    hasil = {}
+    threads = [threading.Thread(target=sesi, args=(path, langkah, ulang, timeout, hasil, i))
+               for i in range(n_pengguna)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    durasi = time.perf_counter() - t0
+
+    api = panggilan_api() - api_awal
+    latensi = np.array([x for c in hasil.values() for daftar in c["latensi"].values() for x in daftar])
+    jumlah_run = max(len(latensi), 1)
+    galat = [g for c in hasil.values() for g in c["galat"]]
+    return {
+        "Halaman": nama,
+        "Pengguna": n_pengguna,
+        "Run": len(latensi),
+        "p50 (s)": np.percentile(latensi, 50) if len(latensi) else np.nan,
+        "p90 (s)": np.percentile(latensi, 90) if len(latensi) else np.nan,
+        "p99 (s)": np.percentile(latensi, 99) if len(latensi) else np.nan,
+        "Maks (s)": latensi.max() if len(latensi) else np.nan,
+        "Run/detik": len(latensi) / durasi,
+        "API/run": sum(api.values()) / jumlah_run,
+        "API teratas": ", ".join(f"{k}={v}" for k, v in api.most_common(3)),
+        "Memori/sesi (KB)": np.mean([c["memori"] for c in hasil.values()]) / 1024,
+        "Galat": len(galat),
+    }, galat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uji beban halaman Streamlit dengan backend palsu")
+    parser.add_argument("--halaman", nargs="+", default=list(SKENARIO), choices=list(SKENARIO))
+    parser.add_argument("--pengguna", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--ulang", type=int, default=1, help="Pengulangan skenario per sesi")
+    parser.add_argument("--anak", type=int, default=300, help="Jumlah balita sintetis per desa")
+    parser.add_argument("--latensi", type=float, default=0.0, help="Jeda per panggilan API palsu (detik)")
+    parser.add_argument("--timeout", type=float, default=120, help="Batas waktu satu run() (detik)")
+    args = parser.parse_args()
+
+    # Dibaca gsheet_utils saat pertama di-import oleh halaman
+    os.environ["GIZI_PALSU_ANAK"] = str(args.anak)
+    os.environ["GIZI_PALSU_LATENSI"] = str(args.latensi)
+
+    pasang_runtime_bersama()
+    baris = []
+    for nama in args.halaman:
+        for n in args.pengguna:
+            ringkas, galat = uji_halaman(nama, n, args.ulang, args.timeout)
+            baris.append(ringkas)
+            print(f"{nama:<18} {n:>4} pengguna  p50 {ringkas['p50 (s)']:.2f}s  p99 {ringkas['p99 (s)']:.2f}s  "
+                  f"API/run {ringkas['API/run']:.2f}  memori/sesi {ringkas['Memori/sesi (KB)']:,.0f} KB")
+            for g in sorted(set(galat))[:5]:
+                print(f"    ⚠️ {g}")
+
+    print()
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(pd.DataFrame(baris).round(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
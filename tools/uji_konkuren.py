@@ -0,0 +1,150 @@
+# ============================== tools/uji_konkuren.py ==============================
+"""
+Uji tulis bersamaan banyak kader terhadap PengukuranStore + worksheet palsu.
+
+    python tools/uji_konkuren.py --thread 16 --operasi 50 --latensi 0.02
+    python tools/uji_konkuren.py --tanpa-cas      # tunjukkan update yang hilang tanpa CAS
+    python tools/uji_konkuren.py --muat-latar     # muat() berulang di thread lain (penyegar latar)
+
+Yang dicek:
+- ID (kolom No) di sheet unik walau insert berjalan paralel
+- Baris "panas" yang di-update semua thread (counter BB +1 per update):
+  nilai akhir = awal + jumlah update sukses (tidak ada update yang hilang)
+- Baris yang baru di-insert langsung bisa di-update berdasarkan ID
+- Snapshot store = hasil muat ulang sheet dari nol
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from sintetis import buat_balita, buat_pengukuran
+from sheet_palsu import LembarPalsu
+from sheet_store import PengukuranStore, KonflikVersi
+
+KOLOM = ["No", "Nama Anak", "Tanggal Pengukuran", "Umur", "BB", "TB",
+         "Z-Score BB/U", "Status BB/U", "Z-Score TB/U", "Status TB/U",
+         "Z-Score BB/TB", "Status BB/TB"]
+
+
+def buat_lembar(n_anak, latensi):
+    df = buat_pengukuran(buat_balita(n_anak), kunjungan_per_anak=6)[KOLOM]
+    return LembarPalsu([KOLOM] + df.values.tolist(), title="Pengukuran", latensi=latensi), df
+
+
+def pekerja(store, id_panas, n_operasi, pakai_cas, hasil, seed):
+    rng = random.Random(seed)
+    catatan = {"insert": [], "naik": {no: 0 for no in id_panas}, "konflik": 0, "hapus": 0, "hilang": 0}
+    for _ in range(n_operasi):
+        aksi = rng.random()
+        if aksi < 0.4:
+            baris = [0, f"ANAK BARU {seed}", "01-01-2025", 12, 9.0, 75.0, 0, "Normal", 0, "Normal", 0, "Gizi Baik"]
+            no_baru = store.insert(baris)
+            catatan["insert"].append(no_baru)
+            # Langsung dibetulkan kader: ID baru harus sudah dikenal store
+            baris[0], baris[4] = no_baru, 9.5
+            try:
+                store.update(no_baru, baris)
+            except KonflikVersi:
+                catatan["hilang"] += 1
+        elif aksi < 0.9:
+            # Read-modify-write pada baris panas: BB dipakai sebagai counter
+            no = rng.choice(id_panas)
+            while True:
+                data, versi = store.ambil(no)
+                data["BB"] = float(data["BB"]) + 1
+                try:
+                    store.update(no, [data[k] for k in KOLOM], versi if pakai_cas else None)
+                    catatan["naik"][no] += 1
+                    break
+                except KonflikVersi:
+                    catatan["konflik"] += 1
+        elif catatan["insert"]:
+            store.hapus(catatan["insert"].pop(rng.randrange(len(catatan["insert"]))))
+            catatan["hapus"] += 1
+    hasil.append(catatan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uji tulis bersamaan PengukuranStore")
+    parser.add_argument("--thread", type=int, default=16)
+    parser.add_argument("--operasi", type=int, default=50, help="Operasi per thread")
+    parser.add_argument("--panas", type=int, default=3, help="Jumlah baris yang diperebutkan")
+    parser.add_argument("--latensi", type=float, default=0.01, help="Jeda per panggilan API (detik)")
+    parser.add_argument("--tanpa-cas", action="store_true", help="Update tanpa cek versi (pembanding)")
+    parser.add_argument("--muat-latar", action="store_true", help="Muat ulang sheet terus-menerus selama uji")
+    args = parser.parse_args()
+
+    ws, df_awal = buat_lembar(200, args.latensi)
+    store = PengukuranStore(ws, KOLOM)
+    store.cek_sheet = not args.tanpa_cas
+    store.muat()
+
+    id_panas = df_awal["No"].head(args.panas).astype(int).tolist()
+    bb_awal = {no: float(store.ambil(no)[0]["BB"]) for no in id_panas}
+
+    hasil = []
+    threads = [threading.Thread(target=pekerja, args=(store, id_panas, args.operasi, not args.tanpa_cas, hasil, i))
+               for i in range(args.thread)]
+    selesai = threading.Event()
+    jumlah_muat = [0]
+
+    def muat_latar():
+        while not selesai.is_set():
+            store.muat()
+            jumlah_muat[0] += 1
+
+    latar = threading.Thread(target=muat_latar, daemon=True) if args.muat_latar else None
+    t0 = time.perf_counter()
+    if latar:
+        latar.start()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    selesai.set()
+    if latar:
+        latar.join()
+    durasi = time.perf_counter() - t0
+
+    # ---------------- PEMERIKSAAN ----------------
+    baru = PengukuranStore(ws, KOLOM)
+    baru.muat()
+    nomor = [r[0] for r in ws.get_all_values()[1:]]
+    naik = {no: sum(h["naik"][no] for h in hasil) for no in id_panas}
+    total_operasi = args.thread * args.operasi
+
+    print(f"{total_operasi} operasi, {args.thread} thread, {durasi:.2f} detik "
+          f"({total_operasi / durasi:,.0f} operasi/detik, latensi API {args.latensi * 1000:.0f} ms)")
+    print(f"Konflik versi (dicoba ulang): {sum(h['konflik'] for h in hasil)}")
+    print(f"Panggilan API: {dict(ws.panggilan)}")
+    if latar:
+        print(f"Muat ulang di latar: {jumlah_muat[0]}x")
+
+    gagal = []
+    hilang = sum(h["hilang"] for h in hasil)
+    if hilang:
+        gagal.append(f"{hilang} baris baru tidak ditemukan saat di-update")
+    if len(nomor) != len(set(nomor)):
+        gagal.append(f"ID ganda di sheet: {len(nomor) - len(set(nomor))}")
+    for no in id_panas:
+        akhir = float(baru.ambil(no)[0]["BB"])
+        status = "OK" if akhir == bb_awal[no] + naik[no] else "UPDATE HILANG"
+        print(f"  No {no}: BB awal {bb_awal[no]:.1f} + {naik[no]} update = {bb_awal[no] + naik[no]:.1f}, di sheet {akhir:.1f} [{status}]")
+        if status != "OK":
+            gagal.append(f"No {no} kehilangan {bb_awal[no] + naik[no] - akhir:.0f} update")
+
+    kiri = store.snapshot().sort_values("No").reset_index(drop=True)
+    kanan = baru.snapshot().sort_values("No").reset_index(drop=True)
+    if not kiri[KOLOM].astype(str).equals(kanan[KOLOM].astype(str)):
+        gagal.append("Snapshot store berbeda dengan isi sheet")
+
+    if gagal:
+        print("❌ " + "; ".join(gagal))
+        raise SystemExit(1)
+    print("✅ Tidak ada ID ganda maupun update yang hilang")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# ============================== train_model.py ==============================
+"""
+Latih ulang model prediksi frekuensi kunjungan (RandomForest).
+
+Contoh:
+    python train_model.py --pengukuran pengukuran.csv --balita balita.csv
+
+Input berupa ekspor sheet Pengukuran / Balita (CSV atau Parquet).
+Matriks fitur di-cache ke model/cache/ sehingga pelatihan ulang dengan
+data yang sama tidak membangun fitur dari awal. Hasil ditulis sebagai
+model/model_rf_gizi_balita_v<waktu>.sav yang otomatis dipakai utils.load_model.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from imblearn.over_sampling import SMOTE, RandomOverSampler
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import classification_report
+from sklearn.model_selection import train_test_split
+
+from fitur_utils import FITUR_MODEL, JENDELA_LABEL_BULAN, bangun_fitur, bangun_label, kategori_frekuensi
+from analitik_utils import siapkan_deret
+from utils import MODEL_DIR
+
+CACHE_DIR = os.path.join(MODEL_DIR, "cache")
+
+
+def baca_tabel(path):
+    if path is None:
+        return None
+    if path.lower().endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def _kunci_cache(paths, tanggal_acuan, jendela_bulan):
+    """Hash isi file input + skema fitur + parameter label"""
+    h = hashlib.sha1()
+    for path in paths:
+        if path:
+            with open(path, "rb") as f:
+                for blok in iter(lambda: f.read(1 << 20), b""):
+                    h.update(blok)
+    h.update(json.dumps([FITUR_MODEL, [str(t) for t in tanggal_acuan], jendela_bulan]).encode())
+    return h.hexdigest()[:16]
+
+
+def daftar_tanggal_acuan(df_deret, jendela_bulan, langkah_bulan=3):
+    """Titik potong tiap langkah_bulan, sisakan jendela label penuh di akhir data"""
+    awal = df_deret["Tanggal Pengukuran"].min() + pd.DateOffset(months=langkah_bulan)
+    akhir = df_deret["Tanggal Pengukuran"].max() - pd.DateOffset(months=jendela_bulan)
+    if awal > akhir:
+        return [akhir]
+    return list(pd.date_range(awal, akhir, freq=f"{langkah_bulan}MS"))
+
+
+def bangun_dataset(df_pengukuran, df_balita, tanggal_acuan, jendela_bulan):
+    """Gabungan (fitur, label) dari beberapa titik potong waktu"""
+    bagian = []
+    for acuan in tanggal_acuan:
+        X = bangun_fitur(df_pengukuran, df_balita, acuan)
+        if X.empty:
+            continue
+        jumlah = bangun_label(df_pengukuran, acuan, jendela_bulan).reindex(X.index, fill_value=0)
+        X = X.copy()
+        X["label"] = kategori_frekuensi(jumlah.to_numpy())
+        bagian.append(X.reset_index(drop=True))
+    if not bagian:
+        return pd.DataFrame(columns=FITUR_MODEL + ["label"])
+    return pd.concat(bagian, ignore_index=True)
+
+
+def seimbangkan(X, y, seed):
+    """Oversampling kelas minoritas dengan imbalanced-learn (SMOTE bila datanya cukup)"""
+    minimal = y.value_counts().min()
+    if minimal > 5:
+        return SMOTE(random_state=seed).fit_resample(X, y)
+    return RandomOverSampler(random_state=seed).fit_resample(X, y)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latih model frekuensi kunjungan balita")
+    parser.add_argument("--pengukuran", required=True, help="CSV/Parquet ekspor sheet Pengukuran")
+    parser.add_argument("--balita", help="CSV/Parquet ekspor sheet Balita (untuk fitur posyandu)")
+    parser.add_argument("--jendela", type=int, default=JENDELA_LABEL_BULAN, help="Jendela label (bulan)")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Jumlah core untuk RandomForest")
+    parser.add_argument("--n-estimators", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tanpa-cache", action="store_true", help="Bangun ulang matriks fitur")
+    args = parser.parse_args()
+
+    df_pengukuran = baca_tabel(args.pengukuran)
+    df_balita = baca_tabel(args.balita)
+
+    deret = siapkan_deret(df_pengukuran)
+    tanggal_acuan = daftar_tanggal_acuan(deret, args.jendela)
+
+    # ---------------- MATRIKS FITUR (CACHE DISK) ----------------
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path_cache = os.path.join(CACHE_DIR, f"fitur_{_kunci_cache([args.pengukuran, args.balita], tanggal_acuan, args.jendela)}.parquet")
+
+    t0 = time.perf_counter()
+    if os.path.exists(path_cache) and not args.tanpa_cache:
+        data = pd.read_parquet(path_cache)
+        print(f"Fitur dari cache: {path_cache}")
+    else:
+        data = bangun_dataset(deret, df_balita, tanggal_acuan, args.jendela)
+        data.to_parquet(path_cache, index=False)
+        print(f"Fitur dibangun & disimpan: {path_cache}")
+    print(f"{len(data)} baris fitur dari {len(tanggal_acuan)} titik potong ({time.perf_counter() - t0:.2f} detik)")
+
+    if data.empty or data["label"].nunique() < 2:
+        raise SystemExit("❌ Data tidak cukup untuk melatih model (butuh minimal 2 kelas label).")
+
+    # ---------------- LATIH ----------------
+    X, y = data[FITUR_MODEL], data["label"]
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=args.seed,
+        stratify=y if y.value_counts().min() >= 2 else None,
+    )
+    X_train, y_train = seimbangkan(X_train, y_train, args.seed)
+
+    t0 = time.perf_counter()
+    model = RandomForestClassifier(
+        n_estimators=args.n_estimators, n_jobs=args.n_jobs,
+        class_weight="balanced", random_state=args.seed,
+    )
+    model.fit(X_train, y_train)
+    print(f"Pelatihan selesai ({time.perf_counter() - t0:.2f} detik)")
+
+    laporan = classification_report(y_test, model.predict(X_test), output_dict=True, zero_division=0)
+    print(classification_report(y_test, model.predict(X_test), zero_division=0))
+
+    # ---------------- SIMPAN ARTEFAK BERVERSI ----------------
+    versi = datetime.now().strftime("%Y%m%d%H%M%S")
+    path_model = os.path.join(MODEL_DIR, f"model_rf_gizi_balita_v{versi}.sav")
+    joblib.dump(model, path_model)
+    with open(path_model.replace(".sav", ".json"), "w") as f:
+        json.dump({
+            "versi": versi,
+            "fitur": FITUR_MODEL,
+            "kelas": [str(k) for k in model.classes_],
+            "jendela_label_bulan": args.jendela,
+            "jumlah_baris": int(len(data)),
+            "akurasi": laporan.get("accuracy"),
+            "cache_fitur": os.path.basename(path_cache),
+            "distribusi_label": {str(k): int(v) for k, v in y.value_counts().items()},
+        }, f, indent=2)
+    print(f"✅ Model disimpan: {path_model}")
+
+
+if __name__ == "__main__":
+    np.seterr(all="ignore")
+    main()
@@ -1,7 +1,9 @@
 # ============================== utils.py ==============================
 
 import os
+import glob
 import sqlite3
+import joblib
 import pandas as pd
 import numpy as np
 from datetime import date
@@ -18,9 +20,46 @@ def get_conn():
 # ======================================================
 # MAPPING POSYANDU BERDASARKAN RT & RW
 # ======================================================
-def map_posyandu(rt, rw):
+DESA_DEFAULT = "MLESE"
+
+# Aturan posyandu per desa: (nama posyandu, daftar RW, daftar RT).
+# Desa lain bisa ditambah lewat Streamlit Secrets (lihat atur_posyandu_desa), contoh:
+# [posyandu.KARANGAN]
+# "Melati 1" = { rw = [1, 2], rt = [1, 2, 3] }
+# "Melati 2" = { rw = [3], rt = [1, 2] }
+# Desa tanpa aturan memakai isian kolom Posyandu di sheet Balita.
+POSYANDU_DESA = {
+    "MLESE": [
+        ("Larasati 1", [6], [1, 2, 3]),       # RT 1–3 / RW 6
+        ("Larasati 2", [4, 5], [1, 2]),       # RT 1–2 / RW 4–5
+        ("Larasati 3", [2, 3], [1, 2, 3]),    # RT 1–3 / RW 2–3
+        ("Larasati 4", [1], [1, 2, 3]),       # RT 1–3 / RW 1
+        ("Larasati 5", [7], [1, 2, 3]),       # RT 1–3 / RW 7
+    ],
+}
+
+def atur_posyandu_desa(konfigurasi):
+    """
+    Tambah / ganti aturan posyandu dari konfigurasi (mis. st.secrets["posyandu"]):
+    {DESA: {nama posyandu: {"rw": [...], "rt": [...]}}}
+    """
+    for desa, daftar in dict(konfigurasi).items():
+        POSYANDU_DESA[str(desa).upper().strip()] = [
+            (str(nama), [int(v) for v in aturan["rw"]], [int(v) for v in aturan["rt"]])
+            for nama, aturan in dict(daftar).items()
+        ]
+
+def _posyandu_sheet(nilai):
+    """Isian kolom Posyandu di sheet (kosong -> None)"""
+    if nilai is None or pd.isna(nilai):
+        return None
+    nilai = str(nilai).strip()
+    return nilai or None
+
+def map_posyandu(rt, rw, desa=DESA_DEFAULT, posyandu_sheet=None):
     """
-    Mapping RT/RW ke Posyandu di Desa Mlese.
+    Mapping RT/RW ke Posyandu sesuai aturan desa (default Desa Mlese).
+    Desa tanpa aturan memakai posyandu_sheet bila diisi.
     Jika kombinasi tidak ada, raise ValueError
     """
     try:
@@ -29,24 +68,44 @@ def map_posyandu(rt, rw):
     except:
         raise ValueError("❌ RT dan RW harus berupa angka.")
 
-    # Larasati 1: RT 1–3 / RW 6
-    if rw == 6 and rt in [1, 2, 3]:
-        return "Larasati 1"
-    # Larasati 2: RT 1–2 / RW 4–5
-    elif rw in [4, 5] and rt in [1, 2]:
-        return "Larasati 2"
-    # Larasati 3: RT 1–3 / RW 2–3
-    elif rw in [2, 3] and rt in [1, 2, 3]:
-        return "Larasati 3"
-    # Larasati 4: RT 1–3 / RW 1
-    elif rw == 1 and rt in [1, 2, 3]:
-        return "Larasati 4"
-    # Larasati 5: RT 1–3 / RW 7
-    elif rw == 7 and rt in [1, 2, 3]:
-        return "Larasati 5"
-    else:
-        # RT/RW tidak sesuai mapping → langsung error
-        raise ValueError(f"❌ Kombinasi RT {rt} / RW {rw} tidak terdaftar di Posyandu Desa Mlese.")
+    desa = str(desa or DESA_DEFAULT).upper().strip()
+    if desa not in POSYANDU_DESA:
+        if _posyandu_sheet(posyandu_sheet):
+            return _posyandu_sheet(posyandu_sheet)
+        raise ValueError(f"❌ Desa {desa} belum memiliki data mapping Posyandu.")
+
+    for nama_posyandu, daftar_rw, daftar_rt in POSYANDU_DESA[desa]:
+        if rw in daftar_rw and rt in daftar_rt:
+            return nama_posyandu
+
+    # RT/RW tidak sesuai mapping → langsung error
+    raise ValueError(f"❌ Kombinasi RT {rt} / RW {rw} tidak terdaftar di Posyandu Desa {desa.title()}.")
+
+def map_posyandu_series(rt, rw, desa=None, posyandu_sheet=None):
+    """
+    Versi vektor dari map_posyandu untuk satu kolom penuh.
+    Desa tanpa aturan memakai kolom posyandu_sheet (bila diberikan).
+    Kombinasi yang tidak terdaftar menjadi NaN (bukan error).
+    """
+    rt = pd.to_numeric(pd.Series(rt), errors="coerce")
+    rw = pd.to_numeric(pd.Series(rw), errors="coerce").set_axis(rt.index)
+    if desa is None:
+        desa = pd.Series(DESA_DEFAULT, index=rt.index)
+    desa = pd.Series(desa).set_axis(rt.index).astype(str).str.upper().str.strip()
+
+    hasil = pd.Series(np.nan, index=rt.index, dtype=object)
+    for nama_desa, aturan in POSYANDU_DESA.items():
+        di_desa = desa == nama_desa
+        for nama_posyandu, daftar_rw, daftar_rt in aturan:
+            cocok = di_desa & rw.isin(daftar_rw) & rt.isin(daftar_rt) & hasil.isna()
+            hasil[cocok] = nama_posyandu
+
+    if posyandu_sheet is not None:
+        isian = pd.Series(posyandu_sheet).set_axis(rt.index).astype(str).str.strip()
+        isian = isian.where(~isian.isin(["", "nan", "None"]))
+        tanpa_aturan = ~desa.isin(list(POSYANDU_DESA))
+        hasil[tanpa_aturan] = isian[tanpa_aturan]
+    return hasil
 
 
 # ======================================================
@@ -66,6 +125,24 @@ def hitung_umur_bulan(tanggal_lahir, tanggal_pengukuran=None):
     return max(int(umur), 0)
 
 
+# ======================================================
+# PARSE TANGGAL (KOLOM PENUH)
+# ======================================================
+def parse_tanggal(series):
+    """
+    Parse kolom tanggal format Indonesia (dd-mm-yyyy).
+    Tanggal banyak berulang, jadi hanya nilai unik yang di-parse lalu dipetakan balik.
+    """
+    series = pd.Series(series)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    kode, unik = pd.factorize(series)
+    hasil = pd.DatetimeIndex(pd.to_datetime(pd.Series(unik, dtype=object), dayfirst=True, errors="coerce"))
+    # kode -1 (nilai kosong) -> NaT
+    tanggal = hasil.take(kode, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(tanggal, index=series.index, name=series.name)
+
+
 # ======================================================
 # LOAD LMS
 # ======================================================
@@ -149,18 +226,130 @@ def status_bbtb(z):
     if z <= 5: return "Gizi Lebih"
     return "Obesitas"
 
+# ======================================================
+# VERSI VEKTOR (BANYAK PENGUKURAN SEKALIGUS)
+# ======================================================
+# Aturan sama dengan fungsi per baris di atas, tetapi untuk kolom penuh
+# (skor massal / ekspor survei). Baris yang tidak bisa dihitung
+# (LMS tidak ditemukan, nilai kosong) menjadi NaN, status "".
+LMS_DIR = os.path.join(BASE_DIR, "data")
+
+def load_semua_lms():
+    """(lms_bbu, lms_tbu, lms_bbtb) dari folder data/"""
+    return tuple(load_lms(os.path.join(LMS_DIR, f"lms_{nama}.csv")) for nama in ["bbu", "tbu", "bbtb"])
+
+def hitung_umur_bulan_series(tanggal_lahir, tanggal_pengukuran):
+    """Umur bulan penuh seperti hitung_umur_bulan, untuk dua kolom tanggal"""
+    tl = parse_tanggal(tanggal_lahir)
+    tp = parse_tanggal(tanggal_pengukuran).set_axis(tl.index)
+    umur = (tp.dt.year - tl.dt.year) * 12 + (tp.dt.month - tl.dt.month)
+    umur = umur - (tp.dt.day < tl.dt.day).astype(int)
+    return umur.clip(lower=0)
+
+def hitung_zscore_vektor(x, L, M, S):
+    x, L, M, S = (np.asarray(v, dtype=float) for v in (x, L, M, S))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_box_cox = ((x / M) ** L - 1) / (L * S)
+        z_log = np.log(x / M) / S
+    return np.where(L == 0, z_log, z_box_cox)
+
+def _ambil_lms(lms, kunci, nilai_kunci):
+    """L, M, S per baris lewat reindex MultiIndex (kunci tidak ada -> NaN)"""
+    tabel = lms.set_index(kunci)[["L", "M", "S"]]
+    baris = tabel.reindex(pd.MultiIndex.from_arrays(nilai_kunci, names=kunci))
+    return baris["L"].to_numpy(), baris["M"].to_numpy(), baris["S"].to_numpy()
+
+def hitung_z_vektor(bb, tb, umur, jk, lms_bbu, lms_tbu, lms_bbtb):
+    """
+    Z-score BB/U, TB/U, BB/TB untuk banyak pengukuran.
+    Aturan BB/TB sama dengan hitung_z_bbtb (TB dibulatkan 0,5 cm, L < 24 bulan, H sesudahnya).
+    """
+    bb = pd.to_numeric(pd.Series(bb), errors="coerce").to_numpy()
+    tb = pd.to_numeric(pd.Series(tb), errors="coerce").to_numpy()
+    umur = pd.to_numeric(pd.Series(umur), errors="coerce").to_numpy()
+    jk = pd.Series(jk).astype(str).str.upper().str.strip().to_numpy()
+
+    z_bbu = hitung_zscore_vektor(bb, *_ambil_lms(lms_bbu, ["umur", "jenis_kelamin"], [umur, jk]))
+    z_tbu = hitung_zscore_vektor(tb, *_ambil_lms(lms_tbu, ["umur", "jenis_kelamin"], [umur, jk]))
+
+    tb_bulat = np.round(tb * 2) / 2
+    lorh = np.where(umur < 24, "L", "H")
+    z_bbtb = hitung_zscore_vektor(bb, *_ambil_lms(lms_bbtb, ["tb", "jenis_kelamin", "lorh"], [tb_bulat, jk, lorh]))
+    return z_bbu, z_tbu, z_bbtb
+
+def _status_vektor(z, batas, label):
+    """batas: [(operator, nilai)] berurutan seperti fungsi status_*; sisa = label terakhir"""
+    z = np.asarray(z, dtype=float)
+    kondisi = [(z < b) if op == "<" else (z <= b) for op, b in batas]
+    hasil = np.select(kondisi, label[:-1], default=label[-1])
+    return np.where(np.isnan(z), "", hasil)
+
+def status_bbu_vektor(z):
+    return _status_vektor(z, [("<", -3), ("<", -2), ("<=", 2)],
+                          ["Sangat Kurang", "Kurang", "Normal", "Risiko BB Lebih"])
+
+def status_tbu_vektor(z):
+    return _status_vektor(z, [("<", -3), ("<", -2), ("<=", 2)],
+                          ["Sangat Pendek", "Pendek", "Normal", "Tinggi"])
+
+def status_bbtb_vektor(z):
+    return _status_vektor(z, [("<", -3), ("<", -2), ("<=", 2), ("<=", 3), ("<=", 5)],
+                          ["Gizi Buruk", "Gizi Kurang", "Gizi Baik", "Risiko Gizi Lebih", "Gizi Lebih", "Obesitas"])
+
+# ======================================================
+# KURVA REFERENSI WHO (GARIS SD)
+# ======================================================
+GARIS_SD = np.arange(-3, 4)
+
+def nilai_dari_zscore(z, L, M, S):
+    """Kebalikan LMS: nilai ukur pada z tertentu (L = 0 -> M * exp(S * z))"""
+    z, L, M, S = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (z, L, M, S)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_box_cox = M * (1 + L * S * z) ** (1 / L)
+    return np.where(L == 0, M * np.exp(S * z), x_box_cox)
+
+# S pada tabel LMS WHO adalah koefisien variasi (sekitar 0,03-0,2). Tabel dengan
+# S jauh di atas itu (mis. data/lms_tbu.csv: L = 1, S 0,9-1,96) bukan LMS yang
+# sebenarnya: kebalikan LMS menghasilkan kurva ratusan cm, jadi tidak digambar.
+BATAS_S_LMS = 0.5
+
+def lms_wajar(lms):
+    """True bila semua S tabel LMS masuk akal sebagai koefisien variasi"""
+    S = pd.to_numeric(lms["S"], errors="coerce")
+    return bool(len(S)) and bool(((S > 0) & (S <= BATAS_S_LMS)).all())
+
+def kurva_sd(lms, sumbu="umur", garis=GARIS_SD):
+    """
+    Kurva -3..+3 SD per jenis kelamin dari tabel LMS, semua sekaligus.
+    Return {jk: (sumbu_x [n], nilai [n, len(garis)])}.
+    """
+    kurva = {}
+    for jk, tabel in lms.sort_values(sumbu).groupby("jenis_kelamin"):
+        L, M, S = (tabel[k].to_numpy()[:, None] for k in ["L", "M", "S"])
+        kurva[jk] = (tabel[sumbu].to_numpy(), nilai_dari_zscore(np.asarray(garis)[None, :], L, M, S))
+    return kurva
+
 # ======================================================
 # ================= MODEL ML ===========================
 # ======================================================
-MODEL_PATH = os.path.join(BASE_DIR, "model", "model_rf_gizi_balita.sav")
+MODEL_DIR = os.path.join(BASE_DIR, "model")
+MODEL_PATH = os.path.join(MODEL_DIR, "model_rf_gizi_balita.sav")
 
-def load_model():
-    if not os.path.exists(MODEL_PATH):
+def cari_model_terbaru():
+    """Artefak hasil train_model.py (model_rf_gizi_balita_v<waktu>.sav) terbaru, fallback MODEL_PATH"""
+    versi = sorted(glob.glob(os.path.join(MODEL_DIR, "model_rf_gizi_balita_v*.sav")))
+    return versi[-1] if versi else MODEL_PATH
+
+def load_model(path=None):
+    path = path or cari_model_terbaru()
+    if not os.path.exists(path):
         return None
-    return joblib.load(MODEL_PATH)
+    return joblib.load(path)
 
-def prediksi_frekuensi(X):
-    model = load_model()
+def prediksi_frekuensi(X, model=None):
+    # Berikan model yang sudah dimuat agar file .sav tidak dibaca ulang
+    if model is None:
+        model = load_model()
     if model is None:
         raise ValueError("Model ML belum tersedia")
     return model.predict(X)
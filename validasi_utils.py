@@ -0,0 +1,112 @@
+# ============================== validasi_utils.py ==============================
+
+import numpy as np
+import pandas as pd
+from analitik_utils import KOLOM_Z, kunci_anak
+from utils import parse_tanggal
+
+# ======================================================
+# VALIDASI NILAI TIDAK WAJAR (BIOLOGICALLY IMPLAUSIBLE VALUES)
+# ======================================================
+# - Batas z-score tidak wajar sesuai WHO: di luar batas ini hampir pasti
+#   salah ketik (mis. 9.5 kg tertulis 95), bukan status gizi
+# - Perubahan mustahil dibanding pengukuran sebelumnya anak yang sama
+# Semua pemeriksaan vektor (groupby + shift), satu kali jalan untuk seluruh sheet.
+
+BATAS_BIV = {
+    "Z-Score BB/U": (-6.0, 5.0),
+    "Z-Score TB/U": (-6.0, 6.0),
+    "Z-Score BB/TB": (-5.0, 5.0),
+}
+TOLERANSI_TURUN_TB = 1.0        # cm; selisih ukur telentang -> berdiri (0,7 cm) masih wajar
+MAKS_PERUBAHAN_BB = 0.40        # perubahan BB relatif per bulan selang terhadap pengukuran sebelumnya
+
+KOLOM_MASALAH = {
+    "BIV BB/U": "Z-Score BB/U di luar -6..+5",
+    "BIV TB/U": "Z-Score TB/U di luar -6..+6",
+    "BIV BB/TB": "Z-Score BB/TB di luar -5..+5",
+    "TB Turun": "TB lebih kecil dari pengukuran sebelumnya",
+    "BB Melonjak": "BB berubah terlalu jauh dari pengukuran sebelumnya",
+}
+
+
+def cek_biv(df):
+    """Flag z-score di luar batas WHO per indikator (NaN tidak di-flag)"""
+    hasil = pd.DataFrame(index=df.index)
+    for kolom, (bawah, atas) in BATAS_BIV.items():
+        z = pd.to_numeric(df[kolom], errors="coerce") if kolom in df.columns else pd.Series(np.nan, index=df.index)
+        hasil["BIV " + kolom.replace("Z-Score ", "")] = (z < bawah) | (z > atas)
+    return hasil
+
+
+def cek_riwayat(df):
+    """
+    Bandingkan tiap pengukuran dengan pengukuran sebelumnya anak yang sama.
+    Return DataFrame (index sama dengan df): TB Sebelumnya, BB Sebelumnya, TB Turun, BB Melonjak.
+    """
+    data = pd.DataFrame({
+        "_tgl": parse_tanggal(df["Tanggal Pengukuran"]),
+        "BB": pd.to_numeric(df["BB"], errors="coerce"),
+        "TB": pd.to_numeric(df["TB"], errors="coerce"),
+    }, index=df.index)
+    kunci = kunci_anak(df)
+    for k in kunci:
+        data[k] = df[k]
+
+    urut = data.sort_values(kunci + ["_tgl"], kind="stable")
+    g = urut.groupby(kunci, sort=False)
+    bb_lalu, tb_lalu, tgl_lalu = g["BB"].shift(), g["TB"].shift(), g["_tgl"].shift()
+
+    selang_bulan = ((urut["_tgl"] - tgl_lalu).dt.days / 30.4375).clip(lower=1)
+    perubahan_bb = (urut["BB"] - bb_lalu).abs() / bb_lalu
+
+    hasil = pd.DataFrame({
+        "BB Sebelumnya": bb_lalu,
+        "TB Sebelumnya": tb_lalu,
+        "TB Turun": (tb_lalu - urut["TB"]) > TOLERANSI_TURUN_TB,
+        "BB Melonjak": perubahan_bb > MAKS_PERUBAHAN_BB * selang_bulan,
+    }, index=urut.index)
+    return hasil.reindex(df.index)
+
+
+def _teks_masalah(flag):
+    """Gabungkan flag boolean jadi satu kolom teks (tanpa apply per baris)"""
+    teks = pd.Series("", index=flag.index)
+    for kolom, keterangan in KOLOM_MASALAH.items():
+        teks = teks + np.where(flag[kolom], keterangan + "; ", "")
+    return teks.str.rstrip("; ")
+
+
+def screening(df_pengukuran):
+    """
+    Periksa seluruh riwayat sekaligus. Return laporan pembersihan:
+    hanya baris bermasalah, dengan nilai sebelumnya dan kolom Masalah.
+    """
+    if df_pengukuran.empty:
+        return pd.DataFrame(columns=["No", "Nama Anak", "Tanggal Pengukuran", "Masalah"])
+
+    flag = pd.concat([cek_biv(df_pengukuran), cek_riwayat(df_pengukuran)], axis=1)
+    ada = flag[list(KOLOM_MASALAH)].any(axis=1)
+
+    kolom = [k for k in ["No", "Desa", "Nama Anak", "Tanggal Pengukuran", "Umur", "BB", "TB"] + KOLOM_Z
+             if k in df_pengukuran.columns]
+    laporan = df_pengukuran.loc[ada, kolom].join(flag.loc[ada])
+    laporan["Masalah"] = _teks_masalah(flag.loc[ada])
+    return laporan.reset_index(drop=True)
+
+
+def validasi_pengukuran(data_baru, riwayat_anak):
+    """
+    Validasi satu pengukuran sebelum disimpan (form input / edit).
+    data_baru: dict Nama Anak, Tanggal Pengukuran, BB, TB, Z-Score BB/U, TB/U, BB/TB.
+    riwayat_anak: riwayat anak tersebut (tanpa baris yang sedang diedit).
+    Return list keterangan masalah (kosong = lolos).
+    """
+    kolom = ["Nama Anak", "Tanggal Pengukuran", "BB", "TB"] + KOLOM_Z
+    riwayat = riwayat_anak[[k for k in kolom if k in riwayat_anak.columns]]
+    calon = pd.DataFrame([{k: data_baru.get(k) for k in kolom}], index=["_baru"])
+    gabung = pd.concat([riwayat, calon])
+
+    flag = pd.concat([cek_biv(calon), cek_riwayat(gabung).loc[["_baru"]]], axis=1)
+    baris = flag.loc["_baru"]
+    return [keterangan for kolom_flag, keterangan in KOLOM_MASALAH.items() if baris[kolom_flag]]